@@ -1,14 +1,53 @@
-import streamlit as st
-import pandas as pd
+import argparse
+import cProfile
+import os
+import pstats
+import tempfile
 import re
-from collections import Counter
-from textblob import TextBlob
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+import sys
+import threading
+import hashlib
+import heapq
+import importlib
+import importlib.metadata
+import multiprocessing
+import sqlite3
 import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing, contextmanager
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from itertools import islice
+from array import array
+from functools import lru_cache
 import base64
 import io
 
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Heavy dependencies are imported by the first stage that uses them, so server start,
+# the empty landing page and the batch CLI only pay for what they actually run
+st = LazyModule("streamlit")
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+plt = LazyModule("matplotlib.pyplot")
+textblob = LazyModule("textblob")
+pattern_en = LazyModule("textblob.en")
+pattern_text = LazyModule("textblob._text")
+wordcloud = LazyModule("wordcloud")
+openpyxl = LazyModule("openpyxl")
+
 # -------------------------------
 # Custom CSS for Ultra Modern UI
 # -------------------------------
@@ -658,19 +697,255 @@ def create_sample_data():
     ]
     return comments
 
-def preprocess_text(comments, stopwords):
-    all_text = " ".join(comments)
-    words = re.findall(r'\b\w+\b', all_text.lower())
-    filtered_words = [w for w in words if w not in stopwords and len(w) > 2]
-    word_counts = Counter(filtered_words)
-    return dict(sorted(word_counts.items(), key=lambda x: x[1], reverse=True))
+WORD_PATTERN = re.compile(r'\b\w+\b')
+KEYWORD_TOP_K = 150
+# Comments folded into the document-term matrix per block; bounds the build's temporaries
+DOC_TERM_CHUNK_ROWS = 8192
+
+def iter_comment_keywords(comments, stopwords):
+    """Yield the filtered keyword tokens of each comment, one comment at a time"""
+    findall = WORD_PATTERN.findall
+    for comment in comments:
+        yield [w for w in findall(comment.lower()) if w not in stopwords and len(w) > 2]
+
+def top_keywords(word_counts, k=KEYWORD_TOP_K):
+    """Return the k most frequent (word, count) pairs using a heap rather than a full sort"""
+    return heapq.nlargest(k, word_counts.items(), key=itemgetter(1))
+
+def iter_doc_term_blocks(comments, stopwords, word_ids, grow=True, chunk_rows=DOC_TERM_CHUNK_ROWS):
+    """Yield ``(nonzeros per row, word ids, counts)`` CSR blocks for ``chunk_rows`` comments at a time.
+
+    Token ids are gathered in int32 buffers one block at a time. New words are
+    added to ``word_ids`` when ``grow`` is set and dropped otherwise.
+    """
+    keywords = iter_comment_keywords(comments, stopwords)
+    while True:
+        tokens, lengths = array("i"), array("i")
+        for words in islice(keywords, chunk_rows):
+            before = len(tokens)
+            if grow:
+                tokens.extend([word_ids.setdefault(word, len(word_ids)) for word in words])
+            else:
+                tokens.extend([word_ids[word] for word in words if word in word_ids])
+            lengths.append(len(tokens) - before)
+        if not lengths:
+            return
+        width = max(len(word_ids), 1)
+        rows = np.repeat(np.arange(len(lengths), dtype=np.int64), np.frombuffer(lengths, dtype=np.intc))
+        # One sort folds repeated words of a comment into (row, word id) cells with counts
+        cells, counts = np.unique(rows * width + np.frombuffer(tokens, dtype=np.intc), return_counts=True)
+        del rows
+        yield np.bincount(cells // width, minlength=len(lengths)), (cells % width).astype(np.int32), counts.astype(np.int32)
+
+def _add_column_sums(column_sums, known, width, indices, counts):
+    """Add one block's counts to a growing int64 column-sum buffer; returns (buffer, columns in use)"""
+    column_sums = _append_to_buffer(column_sums, known, np.zeros(width - known, dtype=np.int64))
+    column_sums[:width] += np.bincount(indices, weights=counts, minlength=width).astype(np.int64)
+    return column_sums, width
+
+class DocumentTermMatrix:
+    """Keyword counts of every comment as a comments x vocabulary CSR matrix.
+
+    A single tokenization pass gives each keyword an integer id (``vocabulary``
+    in first-seen order, ``word_ids`` mapping back) and stores comment i as the
+    ids ``indices[indptr[i]:indptr[i + 1]]`` with their counts in ``data``.
+    Everything downstream is array arithmetic on it: keyword totals are column
+    sums, the comments containing a keyword are the nonzero rows of its column,
+    and word cloud frequencies are the largest column sums. ``append`` stacks
+    more rows underneath; the column index behind lookups is built lazily and
+    only extended over rows it has not seen.
+    """
+
+    def __init__(self, indptr, indices, data, vocabulary, column_sums=None):
+        self.vocabulary = list(vocabulary)
+        self.word_ids = {word: word_id for word_id, word in enumerate(self.vocabulary)}
+        self._indptr = indptr
+        self._indices = indices
+        self._data = data
+        self._rows = len(indptr) - 1
+        self._nnz = int(indptr[-1])
+        if column_sums is None:
+            column_sums = np.bincount(indices, weights=data, minlength=len(self.vocabulary)).astype(np.int64)
+        self._column_sums = column_sums
+        # (blocks of (column indptr, row ids), rows covered), swapped as one tuple so concurrent readers never see half an update
+        self._columns = ((), 0)
+        self._vocabulary_nbytes = sum(map(sys.getsizeof, self.vocabulary))
+
+    @classmethod
+    def from_comments(cls, comments, stopwords, vocabulary=None, chunk_rows=DOC_TERM_CHUNK_ROWS):
+        """Tokenize every comment once; with a fixed ``vocabulary`` all other words are dropped.
+
+        Rows are built a block at a time by iter_doc_term_blocks, so peak
+        memory is the finished arrays plus one block's temporaries rather than
+        a corpus-wide token list.
+        """
+        word_ids = {} if vocabulary is None else {word: word_id for word_id, word in enumerate(vocabulary)}
+        indptr_blocks, index_blocks, data_blocks = [np.zeros(1, dtype=np.int64)], [], []
+        column_sums, known = np.zeros(len(word_ids), dtype=np.int64), len(word_ids)
+        nnz = 0
+        for row_nnz, indices, counts in iter_doc_term_blocks(comments, stopwords, word_ids, vocabulary is None, chunk_rows):
+            indptr_blocks.append(nnz + np.cumsum(row_nnz))
+            index_blocks.append(indices)
+            data_blocks.append(counts)
+            column_sums, known = _add_column_sums(column_sums, known, len(word_ids), indices, counts)
+            nnz += len(indices)
+        # Combine one array at a time, dropping its blocks before the next, to keep the peak near the final size
+        indptr = np.concatenate(indptr_blocks)
+        del indptr_blocks
+        indices = np.concatenate(index_blocks) if index_blocks else np.empty(0, dtype=np.int32)
+        del index_blocks
+        data = np.concatenate(data_blocks) if data_blocks else np.empty(0, dtype=np.int32)
+        del data_blocks
+        return cls(indptr, indices, data, word_ids, column_sums=column_sums[:known])
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def indptr(self):
+        return self._indptr[:self._rows + 1]
+
+    @property
+    def indices(self):
+        return self._indices[:self._nnz]
+
+    @property
+    def data(self):
+        return self._data[:self._nnz]
+
+    def column_sums(self):
+        """Total count of every keyword id"""
+        return self._column_sums[:len(self.vocabulary)]
 
-def highlight_word(text, word):
-    return re.sub(fr"(?i)\b({word})\b", r"**\1**", text)
+    def most_common(self, k=None):
+        """(word, count) pairs by descending count; ties keep first-seen order, like Counter.most_common"""
+        sums = self.column_sums()
+        order = np.argsort(-sums, kind="stable")[:k]
+        return list(zip([self.vocabulary[i] for i in order.tolist()], sums[order].tolist()))
+
+    def column_nonzeros(self, word_id):
+        """Rows (comment ids, ascending) that contain ``word_id``"""
+        parts = [rows[indptr[word_id]:indptr[word_id + 1]] for indptr, rows in self._column_index() if word_id < len(indptr) - 1]
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _column_index(self):
+        """CSC blocks over all rows, transposing only the rows appended since the last lookup"""
+        blocks, covered = self._columns
+        if covered < self._rows:
+            start = int(self._indptr[covered])
+            indices = self._indices[start:self._nnz]
+            row_ids = np.repeat(np.arange(covered, self._rows, dtype=np.int32), np.diff(self._indptr[covered:self._rows + 1]))
+            column_indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(indices, minlength=len(self.vocabulary)), out=column_indptr[1:])
+            blocks += ((column_indptr, row_ids[np.argsort(indices, kind="stable")]),)
+            self._columns = (blocks, self._rows)
+        return blocks
+
+    def copy(self):
+        """A copy that can be appended to without touching this matrix.
+
+        The arrays are shared as exact-size views, so the copy's first append
+        reallocates rather than writing into spare capacity this matrix owns.
+        """
+        other = object.__new__(DocumentTermMatrix)
+        other.__dict__.update(self.__dict__)
+        other.vocabulary = list(self.vocabulary)
+        other.word_ids = dict(self.word_ids)
+        other._indptr, other._indices, other._data = self.indptr, self.indices, self.data
+        other._column_sums = self.column_sums().copy()
+        return other
+
+    def append(self, other):
+        """Stack ``other``'s rows under these in place, mapping its word ids into this vocabulary (O(len(other)))"""
+        known = len(self.vocabulary)
+        word_ids = self.word_ids
+        mapping = np.fromiter(
+            (word_ids.setdefault(word, len(word_ids)) for word in other.vocabulary),
+            dtype=np.int32, count=len(other.vocabulary)
+        )
+        added = [word for word, word_id in zip(other.vocabulary, mapping.tolist()) if word_id >= known]
+        self.vocabulary.extend(added)
+        self._vocabulary_nbytes += sum(map(sys.getsizeof, added))
+        self._indices = _append_to_buffer(self._indices, self._nnz, mapping[other.indices])
+        self._data = _append_to_buffer(self._data, self._nnz, other.data)
+        self._indptr = _append_to_buffer(self._indptr, self._rows + 1, other.indptr[1:] + self._nnz)
+        self._column_sums = _append_to_buffer(self._column_sums, known, np.zeros(len(self.vocabulary) - known, dtype=np.int64))
+        self._column_sums[mapping] += other.column_sums()
+        self._rows += len(other)
+        self._nnz += len(other.indices)
+        return self
+
+    @property
+    def nbytes(self):
+        total = self._indptr.nbytes + self._indices.nbytes + self._data.nbytes + self._column_sums.nbytes
+        total += sum(part.nbytes for block in self._columns[0] for part in block)
+        total += self._vocabulary_nbytes + sys.getsizeof(self.word_ids) + sys.getsizeof(self.vocabulary)
+        return total
+
+# About 110 bytes per tracked word and count, plus the half-size table rebuilt while pruning
+KEYWORD_SKETCH_BYTES_PER_ENTRY = 176
+
+class KeywordSketch:
+    """Bounded-memory heavy-hitters counter (Misra-Gries, the mergeable form of Space-Saving).
+
+    At most ``2 * capacity`` words are tracked. When the table overflows, every
+    count drops by the (capacity + 1)-th largest count and non-positive words
+    are forgotten. Each estimate is a lower bound: a true count lies in
+    ``[estimate, estimate + error]``, and ``error`` never exceeds
+    ``total / (capacity + 1)``.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = Counter()
+        self.total = 0
+        self.error = 0
+
+    @classmethod
+    def for_budget(cls, budget_mb):
+        """Size the sketch so its word table stays within ``budget_mb`` MiB"""
+        return cls(max(1, int(budget_mb * (1 << 20)) // (2 * KEYWORD_SKETCH_BYTES_PER_ENTRY)))
+
+    def update(self, words):
+        self.counts.update(words)
+        self.total += len(words)
+        if len(self.counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        values = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        cut = int(np.partition(values, -(self.capacity + 1))[-(self.capacity + 1)])
+        self.counts = Counter({word: count - cut for word, count in self.counts.items() if count > cut})
+        self.error += cut
+
+    def most_common(self, k=KEYWORD_TOP_K):
+        return top_keywords(self.counts, k)
+
+def sketch_vocabulary(comments, stopwords, sketch, k=KEYWORD_TOP_K):
+    """The ``k`` heaviest keywords found by streaming every comment through ``sketch``"""
+    for words in iter_comment_keywords(comments, stopwords):
+        sketch.update(words)
+    return [word for word, _ in sketch.most_common(k)]
+
+@lru_cache(maxsize=64)
+def keyword_pattern(words):
+    """Compile one escaped, case-insensitive alternation for a tuple of keywords (longest first)"""
+    alternation = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(fr"(?i)\b({alternation})\b")
+
+def highlight_keywords(texts, words):
+    """Bold every occurrence of ``words`` across a page of comments with a single cached pattern"""
+    sub = keyword_pattern(tuple(sorted(set(words)))).sub
+    return [sub(r"**\1**", text) for text in texts]
 
 def analyze_sentiment(comment):
-    blob = TextBlob(comment)
-    polarity = blob.sentiment.polarity
+    blob = textblob.TextBlob(comment)
+    return classify_polarity(blob.sentiment.polarity)
+
+def classify_polarity(polarity):
+    """Map a polarity score to the (label, polarity, class) tuple shown in the UI"""
     if polarity > 0.2:
         return "😊 Positive", polarity, "positive"
     elif polarity < -0.2:
@@ -678,12 +953,9 @@ def analyze_sentiment(comment):
     else:
         return "😐 Neutral", polarity, "neutral"
 
-def get_sentiment_stats(comments):
-    sentiments = [analyze_sentiment(comment) for comment in comments]
-    positive_count = sum(1 for s in sentiments if s[2] == "positive")
-    negative_count = sum(1 for s in sentiments if s[2] == "negative")
-    neutral_count = sum(1 for s in sentiments if s[2] == "neutral")
-    return positive_count, negative_count, neutral_count
+SENTIMENT_CLASSES = ("negative", "neutral", "positive")
+SENTIMENT_LABELS = ("😞 Negative", "😐 Neutral", "😊 Positive")
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENT_CLASSES)}
 
 def show_loading_animation(step, progress, message):
     """Display enhanced loading animation at the bottom of the screen"""
@@ -700,37 +972,167 @@ def show_loading_animation(step, progress, message):
     </div>
     """, unsafe_allow_html=True)
 
-def process_uploaded_file(uploaded_file):
-    """Process uploaded file and extract comments"""
+COMMENT_COLUMNS = ['comment', 'comments', 'text', 'feedback', 'review', 'message', 'content']
+CSV_CHUNK_ROWS = 50_000
+
+def pick_comment_column(columns):
+    """Choose the comment column from a header, falling back to the first column"""
+    for col in COMMENT_COLUMNS:
+        if col in columns:
+            return col
+    return columns[0] if len(columns) > 0 else None
+
+def iter_csv_comments(uploaded_file, chunk_rows=CSV_CHUNK_ROWS):
+    """Sniff the CSV header, then stream only the comment column in chunks of comments"""
+    uploaded_file.seek(0)
+    columns = list(pd.read_csv(uploaded_file, nrows=0).columns)
+    column = pick_comment_column(columns)
+    if column is None:
+        return
+    for candidate in dict.fromkeys([column, columns[0]]):
+        found = 0
+        uploaded_file.seek(0)
+        # Read the column as text so numbers keep their spelling and no chunk infers its own dtype
+        for chunk in pd.read_csv(uploaded_file, usecols=[candidate], dtype={candidate: str}, chunksize=chunk_rows):
+            comments = chunk[candidate].dropna().tolist()
+            found += len(comments)
+            if comments:
+                yield comments
+        if found:
+            break
+
+TEXT_BLOCK_CHARS = 1 << 20
+
+def iter_text_comments(uploaded_file, chunk_rows=CSV_CHUNK_ROWS):
+    """Decode a text upload block by block, yielding chunks of non-blank stripped lines.
+
+    This avoids holding the raw bytes, the decoded text and the split lines at
+    once; callers that collect the chunks (AnalysisPipeline does) still hold
+    every comment.
+    """
+    uploaded_file.seek(0)
+    # newline="\n" leaves "\r" untranslated so lines split exactly where str.split('\n') did
+    reader = io.TextIOWrapper(uploaded_file, encoding="utf-8", newline="\n")
+    try:
+        chunk = []
+        pending = ""
+        while True:
+            block = reader.read(TEXT_BLOCK_CHARS)
+            if not block:
+                break
+            lines = (pending + block).split("\n")
+            pending = lines.pop()
+            chunk.extend(filter(None, map(str.strip, lines)))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        pending = pending.strip()
+        if pending:
+            chunk.append(pending)
+        if chunk:
+            yield chunk
+    finally:
+        # Detach so closing the wrapper (now or on garbage collection) leaves the upload open
+        reader.detach()
+
+def read_excel_comments(uploaded_file):
+    """Load the whole first sheet with pandas and pick the comment column (legacy .xls path)"""
+    uploaded_file.seek(0)
+    df = pd.read_excel(uploaded_file)
     comments = []
-    
-    if uploaded_file is not None:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-            comment_columns = ['comment', 'comments', 'text', 'feedback', 'review', 'message', 'content']
-            for col in comment_columns:
-                if col in df.columns:
-                    comments = df[col].dropna().astype(str).tolist()
-                    break
-            if not comments and len(df.columns) > 0:
-                comments = df.iloc[:, 0].dropna().astype(str).tolist()
-        
-        elif uploaded_file.name.endswith('.txt'):
-            content = uploaded_file.getvalue().decode("utf-8")
-            comments = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-            comment_columns = ['comment', 'comments', 'text', 'feedback', 'review', 'message', 'content']
-            for col in comment_columns:
-                if col in df.columns:
-                    comments = df[col].dropna().astype(str).tolist()
-                    break
-            if not comments and len(df.columns) > 0:
-                comments = df.iloc[:, 0].dropna().astype(str).tolist()
-    
+    for col in COMMENT_COLUMNS:
+        if col in df.columns:
+            comments = df[col].dropna().astype(str).tolist()
+            break
+    if not comments and len(df.columns) > 0:
+        comments = df.iloc[:, 0].dropna().astype(str).tolist()
     return comments
 
+def _calamine():
+    """The optional python-calamine reader, or None when it is not installed"""
+    try:
+        import python_calamine
+    except ImportError:
+        return None
+    return python_calamine
+
+def _close_after(workbook, rows):
+    try:
+        yield from rows
+    finally:
+        workbook.close()
+
+def iter_excel_rows(uploaded_file):
+    """Stream the first sheet's rows as value sequences, or return None when no streaming reader fits.
+
+    python-calamine handles both .xlsx and .xls when installed; otherwise .xlsx is
+    read with openpyxl in read-only mode, which parses rows lazily instead of
+    building the whole workbook in memory.
+    """
+    uploaded_file.seek(0)
+    calamine = _calamine()
+    if calamine is not None:
+        workbook = calamine.CalamineWorkbook.from_filelike(uploaded_file)
+        return _close_after(workbook, workbook.get_sheet_by_index(0).iter_rows())
+    if uploaded_file.name.endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        return _close_after(workbook, workbook.worksheets[0].iter_rows(values_only=True))
+    return None
+
+def iter_excel_comments(uploaded_file, chunk_rows=CSV_CHUNK_ROWS):
+    """Sniff the header row, then stream only the comment column of the first sheet in chunks"""
+    rows = iter_excel_rows(uploaded_file)
+    if rows is None:
+        yield read_excel_comments(uploaded_file)
+        return
+    header = next(rows, None)
+    rows.close()
+    if not header:
+        return
+    columns = list(header)
+    column = pick_comment_column(columns)
+    for index in dict.fromkeys([columns.index(column), 0]):
+        found = 0
+        chunk = []
+        rows = iter_excel_rows(uploaded_file)
+        next(rows, None)
+        for row in rows:
+            value = row[index] if index < len(row) else None
+            if value is None or value == "":
+                continue
+            # calamine reports every number as a float; match pandas' "3" rather than "3.0"
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            chunk.append(str(value))
+            if len(chunk) >= chunk_rows:
+                found += len(chunk)
+                yield chunk
+                chunk = []
+        if chunk:
+            found += len(chunk)
+            yield chunk
+        if found:
+            break
+
+SUPPORTED_EXTENSIONS = (".csv", ".txt", ".xlsx", ".xls")
+
+def iter_uploaded_comments(uploaded_file):
+    """Yield the comments of an uploaded file as successive chunks (lists of strings)"""
+    if uploaded_file is None:
+        return
+    if uploaded_file.name.endswith('.csv'):
+        yield from iter_csv_comments(uploaded_file)
+    
+    elif uploaded_file.name.endswith('.txt'):
+        yield from iter_text_comments(uploaded_file)
+    
+    elif uploaded_file.name.endswith(('.xlsx', '.xls')):
+        yield from iter_excel_comments(uploaded_file)
+
+def process_uploaded_file(uploaded_file):
+    """Process uploaded file and extract comments"""
+    return [comment for chunk in iter_uploaded_comments(uploaded_file) for comment in chunk]
+
 def get_keyword_color_class(frequency, max_frequency):
     """Get different color classes based on frequency"""
     if max_frequency == 0:
@@ -756,11 +1158,1343 @@ stopwords = {
     "re", "ve", "y", "ma", "but", "etc", "e.g", "i.e", "would", "could", "shall"
 }
 
+# -------------------------------
+# Fast Lexicon Sentiment Engine
+# -------------------------------
+
+SENTIMENT_ENGINES = {
+    "textblob": "TextBlob (per comment)",
+    "lexicon": "Fast lexicon (batch)",
+}
+
+_DOC_BREAK = "\x00"
+_QUOTES = ("“", "”", "‘", "’", "'", '"')
+_PARAGRAPH_BREAK = re.compile(r"\n{2,}")
+
+@lru_cache(maxsize=None)
+def _punctuation_sets():
+    """(leading, trailing) punctuation sets of pattern's tokenizer"""
+    leading = frozenset(pattern_text.PUNCTUATION.replace(".", ""))
+    return leading, leading | {"."}
+
+def _is_abbreviation(token):
+    return (
+        token in pattern_text.ABBREVIATIONS
+        or pattern_text.RE_ABBR1.match(token) is not None
+        or pattern_text.RE_ABBR2.match(token) is not None
+        or pattern_text.RE_ABBR3.match(token) is not None
+    )
+
+def _split_punctuation(token, tokens):
+    """Split leading and trailing punctuation off one raw token exactly like pattern's find_tokens"""
+    leading, trailing = _punctuation_sets()
+    while token and token[0] in leading:
+        tokens.append(token[0])
+        token = token[1:]
+    tail = []
+    while token and token[-1] in trailing:
+        if token[-1] in leading:
+            tail.append(token[-1])
+            token = token[:-1]
+        if token.endswith("..."):
+            tail.append("...")
+            token = token[:-3].rstrip(".")
+        if token.endswith("."):
+            if _is_abbreviation(token):
+                break
+            tail.append(".")
+            token = token[:-1]
+    if token:
+        tokens.append(token)
+    tokens.extend(reversed(tail))
+
+def tokenize_for_sentiment(comments):
+    """Tokenize a whole corpus in one pass into the lowercase token stream TextBlob would see.
+
+    Comments are separated by a ``_DOC_BREAK`` token. Punctuation splitting is
+    done once per distinct raw token rather than once per occurrence, and the
+    sarcasm and emoticon rules run over the joined corpus in a single regex pass.
+    """
+    eos = pattern_text.EOS
+    leading, trailing = _punctuation_sets()
+    text = f" {_DOC_BREAK} ".join(str(c).replace(_DOC_BREAK, " ") for c in comments)
+    for contraction, spaced in pattern_text.replacements.items():
+        text = text.replace(contraction, spaced)
+    for quote in _QUOTES:
+        text = text.replace(quote, f" {quote} ")
+    text = _PARAGRAPH_BREAK.sub(f" {eos} ", text.replace("\r\n", "\n"))
+    raw = text.split()
+    splits = {}
+    for token in dict.fromkeys(raw):
+        if token[0] in leading or token[-1] in trailing or token == eos:
+            pieces = []
+            _split_punctuation(token, pieces)
+            splits[token] = " ".join(p for p in pieces if p != eos)
+    text = " ".join(map(splits.get, raw, raw))
+    if "" in splits.values():
+        text = " ".join(text.split())
+    text = pattern_text.RE_SARCASM.sub("(!)", text)
+    text = pattern_text.RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), text)
+    return text.lower().split()
+
+class LexiconSentimentEngine:
+    """Batch polarity scorer over TextBlob's own pattern lexicon.
+
+    The lexicon is resolved once into flat (polarity, intensity, is_modifier)
+    entries, the corpus is tokenized in one pass, and per-comment polarities are
+    averaged with NumPy. Modifier ("very good"), negation ("not good"),
+    exclamation, sarcasm and emoticon handling follow pattern's assessments,
+    so scores match ``TextBlob(comment).sentiment.polarity``.
+    """
+
+    def __init__(self):
+        lexicon = pattern_en.sentiment
+        self._entries = {}
+        for word, senses in lexicon.items():
+            polarity, _, intensity = senses[None]
+            is_modifier = any(pos in senses for pos in lexicon.modifiers)
+            self._entries[word] = (polarity, intensity, is_modifier)
+        self._negations = frozenset(lexicon.negations)
+        self._is_modifier_word = lexicon.modifier
+        self._punctuation = pattern_text.PUNCTUATION
+        self._emoticons = {}
+        for (_, polarity), faces in pattern_text.EMOTICONS.items():
+            for face in faces:
+                self._emoticons.setdefault(face.lower(), polarity)
+
+    def polarities(self, comments):
+        entries = self._entries
+        negations = self._negations
+        is_modifier_word = self._is_modifier_word
+        emoticons = self._emoticons
+        punctuation = self._punctuation
+        doc_ids, scores, intensities, negated = [], [], [], []
+        doc, doc_start, modifier, negation = 0, 0, None, None
+        for w in tokenize_for_sentiment(comments):
+            if w == _DOC_BREAK:
+                doc, doc_start, modifier, negation = doc + 1, len(scores), None, None
+                continue
+            entry = entries.get(w)
+            if entry is not None:
+                p, i, w_is_modifier = entry
+                if modifier is None:
+                    doc_ids.append(doc)
+                    scores.append(p)
+                    intensities.append(i)
+                    negated.append(False)
+                else:
+                    scores[-1] = max(-1.0, min(p * intensities[-1], 1.0))
+                    intensities[-1] = i
+                if negation is not None:
+                    intensities[-1] = 1.0 / intensities[-1]
+                    negated[-1] = True
+                modifier = w if w_is_modifier else None
+                negation = w if w in negations else None
+                continue
+            if w in negations:
+                negation = w
+            elif negation and len(w.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and is_modifier_word(modifier):
+                negated[-1] = True
+                negation = None
+            elif modifier and len(w) > 2:
+                modifier = None
+            if w == "!" and len(scores) > doc_start:
+                scores[-1] = max(-1.0, min(scores[-1] * 1.25, 1.0))
+            if w == "(!)":
+                doc_ids.append(doc)
+                scores.append(0.0)
+                intensities.append(1.0)
+                negated.append(False)
+            if not w.isalpha() and len(w) <= 5 and w not in punctuation and w in emoticons:
+                doc_ids.append(doc)
+                scores.append(emoticons[w])
+                intensities.append(1.0)
+                negated.append(False)
+
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        scores = np.where(np.asarray(negated, dtype=bool), scores * -0.5, scores)
+        totals = np.bincount(doc_ids, weights=scores, minlength=len(comments))
+        counts = np.bincount(doc_ids, minlength=len(comments))
+        return totals / np.maximum(counts, 1)
+
+    def score(self, comments):
+        return [classify_polarity(float(p)) for p in self.polarities(comments)]
+
+def get_lexicon_engine():
+    """Resolve the lexicon once per process and share the engine between sessions (it holds no per-call state)"""
+    return process_resource(LexiconSentimentEngine)
+
+def score_sentiments(comments, engine="textblob"):
+    """Return analyze_sentiment-style tuples for every comment using the chosen engine"""
+    if engine == "lexicon":
+        return get_lexicon_engine().score(comments)
+    return [analyze_sentiment(comment) for comment in comments]
+
+PARALLEL_MIN_COMMENTS = 5000
+
+def available_cpus():
+    """Cores this process may run on (its affinity mask or container cpuset), not the host's core count"""
+    if hasattr(os, "process_cpu_count"):
+        return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+def _importable_function(name):
+    """Look a function up through the importable module so worker processes can unpickle it.
+
+    Under ``streamlit run`` this file executes as ``__main__``, which pool
+    workers cannot import; resolving through the module name avoids that.
+    """
+    module = importlib.import_module(os.path.splitext(os.path.basename(__file__))[0])
+    return getattr(module, name)
+
+def pool_context():
+    """Start method for scoring pools: never fork, since the pool is started from a job thread of a threaded server.
+
+    A forked child inherits only the calling thread, so locks held by other
+    threads at fork time stay locked forever. forkserver forks from a clean
+    single-threaded helper; spawn is the fallback where it does not exist.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def dedupe_comments(comments):
+    """Return the distinct texts in first-seen order and, per comment, the position of its text"""
+    positions = {}
+    inverse = [positions.setdefault(comment, len(positions)) for comment in comments]
+    return list(positions), inverse
+
+def score_in_chunks(comments, engine="textblob", chunk_size=500, parallel=False, workers=None, on_chunk=None,
+                    score_cache=None):
+    """Score comments chunk by chunk, optionally across a process pool, preserving input order.
+
+    Each distinct text is scored once and its result fanned back out to every
+    copy, so ``on_chunk(done, total, chunk_sentiments)`` counts distinct texts. With a
+    ``score_cache`` (for engines in SCORE_CACHE_ENGINES) only texts it has not
+    seen before are scored. It is called after every finished chunk. Parallel
+    mode falls back to in-process scoring for inputs smaller than
+    ``PARALLEL_MIN_COMMENTS`` or when only one core is available, where pool
+    start-up would cost more than it saves.
+    """
+    unique, inverse = dedupe_comments(comments)
+    if score_cache is not None and engine in SCORE_CACHE_ENGINES:
+        scored = score_cache.score(
+            unique, engine, lambda missing: score_in_chunks(missing, engine, chunk_size, parallel, workers, on_chunk)
+        )
+        return [scored[position] for position in inverse]
+    if len(unique) < len(comments):
+        scored = score_in_chunks(unique, engine, chunk_size, parallel, workers, on_chunk)
+        return [scored[position] for position in inverse]
+
+    total = len(comments)
+    workers = workers or available_cpus()
+    if not parallel or workers < 2 or total < PARALLEL_MIN_COMMENTS:
+        sentiments = []
+        for start in range(0, total, chunk_size):
+            chunk_sentiments = score_sentiments(comments[start:start + chunk_size], engine)
+            sentiments.extend(chunk_sentiments)
+            if on_chunk is not None:
+                on_chunk(len(sentiments), total, chunk_sentiments)
+        return sentiments
+
+    chunk_size = max(chunk_size, -(-total // (workers * 4)))
+    chunks = [comments[start:start + chunk_size] for start in range(0, total, chunk_size)]
+    results = [None] * len(chunks)
+    score_chunk = _importable_function("score_sentiments")
+    done = 0
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=pool_context()) as pool:
+        futures = {pool.submit(score_chunk, chunk, engine): index for index, chunk in enumerate(chunks)}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                done += len(chunks[index])
+                if on_chunk is not None:
+                    on_chunk(done, total, results[index])
+        except BaseException:
+            # A failing or cancelling callback should not wait for the chunks still queued
+            for future in futures:
+                future.cancel()
+            raise
+    return [sentiment for chunk in results for sentiment in chunk]
+
+def compare_sentiment_engines(comments):
+    """Parity report of the lexicon engine against per-comment TextBlob"""
+    fast = get_lexicon_engine().polarities(comments)
+    reference = np.array([textblob.TextBlob(c).sentiment.polarity for c in comments], dtype=np.float64)
+    fast_classes = [classify_polarity(p)[2] for p in fast]
+    reference_classes = [classify_polarity(p)[2] for p in reference]
+    return {
+        "comments": len(comments),
+        "max_abs_diff": float(np.abs(fast - reference).max()) if len(comments) else 0.0,
+        "label_agreement": sum(a == b for a, b in zip(fast_classes, reference_classes)) / max(len(comments), 1),
+    }
+
+# -------------------------------
+# Persistent Score Cache
+# -------------------------------
+
+SCORE_CACHE_ENV = "JURISMIND_SCORE_CACHE"
+SCORE_CACHE_MAX_ENTRIES = 1_000_000
+SCORER_REVISION = 1
+# The lexicon engine scores faster than a cache round trip, so only TextBlob scores are persisted
+SCORE_CACHE_ENGINES = ("textblob",)
+
+@lru_cache(maxsize=None)
+def scorer_version(engine):
+    """Cache namespace for an engine: bump SCORER_REVISION or upgrade TextBlob and old scores stop matching"""
+    return f"{engine}/{SCORER_REVISION}/textblob-{importlib.metadata.version('textblob')}"
+
+class ScoreCache:
+    """SQLite-backed map of (scorer version, comment) -> polarity shared by every session and restart.
+
+    Keys are 16-byte BLAKE2 digests, so the file never stores comment text.
+    Lookups and writes go in batches, hits refresh a last-used stamp, and once
+    the table grows past ``max_entries`` the least recently used rows are evicted.
+    """
+
+    def __init__(self, path, max_entries=SCORE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS scores (key BLOB PRIMARY KEY, polarity REAL NOT NULL, used INTEGER NOT NULL) WITHOUT ROWID")
+            db.execute("CREATE INDEX IF NOT EXISTS scores_used ON scores (used)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps the cache safe to use from any session thread
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def _keys(engine, comments):
+        prefix = scorer_version(engine).encode() + b"\x00"
+        return [hashlib.blake2b(prefix + comment.encode("utf-8", "surrogatepass"), digest_size=16).digest() for comment in comments]
+
+    def lookup(self, engine, comments):
+        """Return the cached polarity of each comment, or None where it has not been scored yet"""
+        keys = self._keys(engine, comments)
+        with closing(self._connect()) as db, db:
+            # Join against a temp table of wanted keys instead of thousands of IN (...) batches
+            db.execute("CREATE TEMP TABLE wanted (key BLOB PRIMARY KEY) WITHOUT ROWID")
+            db.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", zip(keys))
+            found = dict(db.execute("SELECT key, polarity FROM scores JOIN wanted USING (key)"))
+            if found:
+                db.execute("UPDATE scores SET used = ? WHERE key IN (SELECT key FROM wanted)", (int(time.time()),))
+        return [found.get(key) for key in keys]
+
+    def store(self, engine, comments, polarities):
+        """Write freshly scored polarities in one transaction, then evict down to ``max_entries``"""
+        now = int(time.time())
+        rows = zip(self._keys(engine, comments), map(float, polarities), [now] * len(comments))
+        with closing(self._connect()) as db, db:
+            db.executemany("INSERT OR REPLACE INTO scores (key, polarity, used) VALUES (?, ?, ?)", rows)
+            excess = db.execute("SELECT COUNT(*) FROM scores").fetchone()[0] - self.max_entries
+            if excess > 0:
+                db.execute("DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY used LIMIT ?)", (excess,))
+
+    def score(self, comments, engine, score_missing):
+        """Sentiment tuples for distinct ``comments``, calling ``score_missing`` only for cache misses"""
+        polarities = self.lookup(engine, comments)
+        missing = [comment for comment, polarity in zip(comments, polarities) if polarity is None]
+        self.hits += len(comments) - len(missing)
+        self.misses += len(missing)
+        fresh = []
+        if missing:
+            fresh = score_missing(missing)
+            self.store(engine, missing, [polarity for _, polarity, _ in fresh])
+        fresh = iter(fresh)
+        return [next(fresh) if polarity is None else classify_polarity(polarity) for polarity in polarities]
+
+    def clear(self):
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM scores")
+
+def default_score_cache():
+    """The score cache at $JURISMIND_SCORE_CACHE (default ~/.cache/jurismind/scores.sqlite3); None if set empty or unusable"""
+    path = os.environ.get(SCORE_CACHE_ENV)
+    if path is None:
+        path = os.path.join(os.path.expanduser("~"), ".cache", "jurismind", "scores.sqlite3")
+    if not path:
+        return None
+    try:
+        return ScoreCache(path)
+    except (OSError, sqlite3.Error):
+        return None
+
+# -------------------------------
+# Near-Duplicate Detection
+# -------------------------------
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+NEAR_DUPLICATE_THRESHOLD = 0.8
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def comment_shingles(comment):
+    """Hash the word 3-grams of a comment to 32-bit ints (comments under three words become one shingle).
+
+    Python's string hash is salted per process, which is fine here: signatures
+    are only ever compared within the run that computed them.
+    """
+    words = WORD_PATTERN.findall(comment.lower())
+    if len(words) < 3:
+        return [hash(tuple(words)) & 0xFFFFFFFF] if words else []
+    return [hash(shingle) & 0xFFFFFFFF for shingle in zip(words, words[1:], words[2:])]
+
+def minhash_signatures(shingle_sets, num_perm=MINHASH_PERMUTATIONS, seed=0):
+    """MinHash signature matrix (documents x ``num_perm``) for lists of hashed shingles.
+
+    Every document must have at least one shingle. All shingles are hashed in
+    one flat array and reduced per document with ``np.minimum.reduceat``.
+    """
+    lengths = np.fromiter((len(shingles) for shingles in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    hashes = np.fromiter((h for shingles in shingle_sets for h in shingles), dtype=np.uint64, count=int(lengths.sum()))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    for k in range(num_perm):
+        # a, b and the hashes are all below 2**32, so a * h + b stays below 2**64
+        signatures[:, k] = np.minimum.reduceat((a[k] * hashes + b[k]) % _MERSENNE_PRIME, starts)
+    return signatures
+
+def near_duplicate_clusters(comments, threshold=NEAR_DUPLICATE_THRESHOLD, num_perm=MINHASH_PERMUTATIONS,
+                            bands=MINHASH_BANDS):
+    """Label each comment with the index of the first comment of its near-duplicate cluster.
+
+    Distinct texts are MinHashed over word 3-gram shingles and bucketed with
+    LSH (``bands`` bands of ``num_perm // bands`` rows). Bucket mates whose
+    signatures agree on at least ``threshold`` of the permutations (the
+    estimated Jaccard similarity) are merged. Exact duplicates always share a
+    cluster; comments without words stay on their own.
+    """
+    unique, inverse = dedupe_comments(comments)
+    shingle_sets = [comment_shingles(comment) for comment in unique]
+    candidates = [i for i, shingles in enumerate(shingle_sets) if shingles]
+    parent = list(range(len(unique)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(candidates) > 1:
+        signatures = minhash_signatures([shingle_sets[i] for i in candidates], num_perm)
+        rows = num_perm // bands
+        mixer = np.random.default_rng(1).integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+        for band in range(bands):
+            # Fold each band into one 64-bit key, then pair every row with the first row of its bucket
+            keys = (signatures[:, band * rows:(band + 1) * rows] * mixer).sum(axis=1)
+            _, first_rows, bucket = np.unique(keys, return_index=True, return_inverse=True)
+            firsts = first_rows[bucket]
+            pairs = np.flatnonzero(firsts != np.arange(len(keys)))
+            agreement = (signatures[firsts[pairs]] == signatures[pairs]).mean(axis=1)
+            matched = pairs[agreement >= threshold]
+            for first, row in zip(firsts[matched].tolist(), matched.tolist()):
+                root_a, root_b = find(candidates[first]), find(candidates[row])
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    # Map every cluster root (a distinct text) to the first comment carrying that text
+    first_comment = {}
+    for index, position in enumerate(inverse):
+        first_comment.setdefault(position, index)
+    return np.array([first_comment[find(position)] for position in inverse], dtype=np.int64)
+
+def cluster_representatives(comment_ids, clusters):
+    """Keep only the first of ``comment_ids`` from each near-duplicate cluster, in their original order"""
+    comment_ids = np.asarray(comment_ids, dtype=np.int64)
+    _, first = np.unique(clusters[comment_ids], return_index=True)
+    return comment_ids[np.sort(first)]
+
+def similar_count(comment_id, clusters, cluster_sizes):
+    """Other comments in ``comment_id``'s cluster; sizes are indexed by cluster label, so any member works"""
+    return int(cluster_sizes[clusters[comment_id]]) - 1
+
+# -------------------------------
+# Instrumentation
+# -------------------------------
+
+class StageTimer:
+    """Accumulate wall time, call counts and rows processed per named stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0})
+            entry["seconds"] += time.perf_counter() - start
+            entry["calls"] += 1
+            entry["rows"] += rows
+
+    def add_rows(self, name, rows):
+        """Credit rows to a stage whose row count was only known after it finished"""
+        self.stages[name]["rows"] += rows
+
+    def rows(self):
+        return [
+            {"stage": name, "ms": round(entry["seconds"] * 1000, 2), "calls": entry["calls"], "rows": entry["rows"]}
+            for name, entry in self.stages.items()
+        ]
+
+def profile_report(profiler, limit=25):
+    """Return (pstats file bytes, text summary sorted by cumulative time) for a finished profiler"""
+    with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as stats_file:
+        path = stats_file.name
+    try:
+        profiler.dump_stats(path)
+        with open(path, "rb") as stats_file:
+            data = stats_file.read()
+    finally:
+        os.remove(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(limit)
+    return data, summary.getvalue()
+
+# -------------------------------
+# Analysis Pipeline
+# -------------------------------
+
+def build_wordcloud(word_counts):
+    """Lay out the keyword word cloud for the given frequencies"""
+    return wordcloud.WordCloud(
+        width=1200, 
+        height=600, 
+        background_color=None,
+        mode="RGBA",
+        colormap="plasma",
+        max_words=150,
+        relative_scaling=0.5,
+        collocations=False,
+        prefer_horizontal=0.7,
+        min_font_size=10,
+        max_font_size=150,
+        random_state=42
+    ).generate_from_frequencies(word_counts)
+
+# Streamlit downscales any image wider than 1460px on every render; 100 dpi keeps charts under that
+CHART_DPI = 100
+
+def figure_to_png(fig):
+    """Save a matplotlib figure as PNG bytes and release it"""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+def render_wordcloud_png(keywords):
+    """Render the keyword frequency cloud for (word, count) pairs as PNG bytes"""
+    wc = build_wordcloud(dict(keywords))
+    fig, ax = plt.subplots(figsize=(14, 7), facecolor='#0a0a0a')
+    ax.imshow(wc, interpolation="bilinear")
+    ax.axis("off")
+    ax.set_title("Keyword Frequency Cloud", fontsize=20, pad=20, fontweight='bold', color='white')
+    fig.patch.set_facecolor('#0a0a0a')
+    fig.tight_layout()
+    return figure_to_png(fig)
+
+def render_sentiment_pie_png(sentiment_tallies):
+    """Render the (positive, neutral, negative) distribution pie chart as PNG bytes"""
+    fig, ax = plt.subplots(figsize=(10, 8), facecolor='#0a0a0a')
+    labels = ['Positive', 'Neutral', 'Negative']
+    colors = ['#10b981', '#f59e0b', '#ef4444']
+    explode = (0.05, 0.02, 0.05)
+    
+    ax.pie(
+        sentiment_tallies, explode=explode, labels=labels, colors=colors, 
+        autopct='%1.1f%%', startangle=90, shadow=True,
+        textprops={'color': 'white', 'fontsize': 12, 'fontweight': 'bold'}
+    )
+    
+    ax.axis('equal')
+    ax.set_title('Sentiment Distribution', fontsize=16, fontweight='bold', pad=30, color='white')
+    fig.tight_layout()
+    return figure_to_png(fig)
+
+# Shared by every session on the server
+CHART_CACHE_MAX_ENTRIES = 64
+
+def render_chart(cache, kind, data, render):
+    """Return PNG bytes for ``render(data)``, reusing an image cached under a fingerprint of the data"""
+    if cache is None:
+        return render(data)
+    key = hashlib.sha256(repr((kind, tuple(data))).encode("utf-8")).hexdigest()
+    png = cache.get(key)
+    if png is None:
+        png = render(data)
+        cache.put(key, png)
+    return png
+
+ANALYSIS_CACHE_MAX_ENTRIES = 8
+ANALYSIS_CACHE_TTL_SECONDS = 60 * 60
+
+class LRUCache:
+    """Bounded mapping with least-recently-used and time-to-live eviction.
+
+    With ``max_bytes`` the values' ``sizeof`` also counts towards the bound and
+    a value bigger than the whole budget is not cached. Safe to share between
+    sessions and their analysis threads.
+    """
+
+    def __init__(self, max_entries, ttl=None, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof if sizeof is not None else (lambda value: 0)
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            stored_at, value, nbytes = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.nbytes -= nbytes
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        nbytes = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[2]
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic(), value, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self.nbytes -= self._entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+def analysis_cache_key(uploaded_file, stopwords, engine="textblob", keyword_budget_mb=None):
+    """Hash the uploaded file's name and bytes (or the sample data) with the stopword set, engine and keyword mode"""
+    digest = hashlib.sha256(f"{engine}/{keyword_budget_mb}".encode("utf-8"))
+    if uploaded_file is None:
+        digest.update("\n".join(create_sample_data()).encode("utf-8"))
+    else:
+        digest.update(uploaded_file.name.encode("utf-8"))
+        uploaded_file.seek(0)
+        for block in iter(lambda: uploaded_file.read(1 << 20), b""):
+            digest.update(block)
+        uploaded_file.seek(0)
+    digest.update("\0".join(sorted(stopwords)).encode("utf-8"))
+    return digest.hexdigest()
+
+def compact_strings(values):
+    """One Arrow buffer of offsets plus UTF-8 bytes when pyarrow is installed, else an object array"""
+    try:
+        return pd.array(values, dtype="string[pyarrow]")
+    except ImportError:
+        return np.array(values, dtype=object)
+
+def _append_to_buffer(buffer, size, values):
+    """Write ``values`` after the first ``size`` items, doubling the buffer when full (amortised O(len(values)))"""
+    needed = size + len(values)
+    if needed > len(buffer):
+        grown = np.empty(max(needed, 2 * len(buffer)), dtype=buffer.dtype)
+        grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:needed] = values
+    return buffer
+
+class AnalysisStore:
+    """Columnar analysis results kept in session state and read by the UI.
+
+    Comments live in one string column, polarity as float32 and the sentiment
+    class as int8 codes into SENTIMENT_CLASSES. Keywords live in a
+    DocumentTermMatrix with one row per comment, so counts, lookups and the
+    word cloud never re-read the text. ``approximate`` marks a matrix limited
+    to the words a sketch picked, and ``keyword_error`` is that sketch's
+    undercount bound (0 when it never had to prune).
+    """
+
+    def __init__(self, comments, polarity, codes, doc_terms,
+                 wordcloud_png=None, sentiment_pie_png=None, keyword_error=0, source=None, approximate=False):
+        self.comments = comments
+        self._size = len(codes)
+        self._polarity = polarity
+        self._codes = codes
+        self.doc_terms = doc_terms
+        self.keyword_error = keyword_error
+        self.approximate = approximate
+        self.wordcloud_png = wordcloud_png
+        self.sentiment_pie_png = sentiment_pie_png
+        self.duplicate_clusters = None
+        self.sources = [source] if source else []
+        self._top = None
+        self._comments_nbytes = None
+        negative, neutral, positive = np.bincount(codes, minlength=len(SENTIMENT_CLASSES)).tolist()
+        self.sentiment_counts = (positive, negative, neutral)
+
+    @classmethod
+    def from_results(cls, results):
+        return cls(
+            compact_strings(results["comments"]), results["polarity"], results["sentiment_codes"], results["doc_terms"],
+            wordcloud_png=results.get("wordcloud_png"), sentiment_pie_png=results.get("sentiment_pie_png"),
+            keyword_error=results.get("keyword_error", 0), source=results.get("source"),
+            approximate=results.get("approximate", False)
+        )
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def polarity(self):
+        return self._polarity[:self._size]
+
+    @property
+    def codes(self):
+        return self._codes[:self._size]
+
+    @property
+    def vocabulary(self):
+        return self.doc_terms.vocabulary
+
+    @property
+    def keyword_counts(self):
+        return self.doc_terms.column_sums()
+
+    def copy(self):
+        """A copy that can be appended to without touching this store (string columns and keyword arrays are shared)"""
+        other = object.__new__(AnalysisStore)
+        other.__dict__.update(self.__dict__)
+        other._polarity = self.polarity.copy()
+        other._codes = self.codes.copy()
+        other.doc_terms = self.doc_terms.copy()
+        other.sources = list(self.sources)
+        return other
+
+    def append(self, batch, chart_cache=None):
+        """Merge another analysis into this one in place; the cost is proportional to ``batch``, not to this store.
+
+        The batch's document-term rows are stacked under the existing ones with
+        its word ids mapped into this vocabulary, tallies are added and the
+        charts re-rendered from the merged counts. Near-duplicate clusters are
+        dropped and recomputed on next use.
+        """
+        # A sketched analysis indexes only its own top words, even when the sketch reports no error
+        if self.approximate or batch.approximate:
+            raise ValueError("Only analyses with exact keyword counts can be merged")
+        offset = self._size
+        if isinstance(self.comments, np.ndarray):
+            self.comments = np.concatenate([self.comments, batch.comments])
+        else:
+            self.comments = self.comments._concat_same_type([self.comments, batch.comments])
+        self._comments_nbytes = None
+        self._polarity = _append_to_buffer(self._polarity, offset, batch.polarity)
+        self._codes = _append_to_buffer(self._codes, offset, batch.codes)
+        self._size += len(batch)
+        self.doc_terms.append(batch.doc_terms)
+
+        self.sentiment_counts = tuple(a + b for a, b in zip(self.sentiment_counts, batch.sentiment_counts))
+        self.sources.extend(batch.sources)
+        self.duplicate_clusters = None
+        self._top = None
+        self.render_charts(chart_cache)
+        return self
+
+    def render_charts(self, chart_cache=None):
+        keywords = self.top_keywords()
+        positive_count, negative_count, neutral_count = self.sentiment_counts
+        self.wordcloud_png = render_chart(chart_cache, "wordcloud", keywords, render_wordcloud_png) if keywords else None
+        tallies = (positive_count, neutral_count, negative_count)
+        self.sentiment_pie_png = render_chart(chart_cache, "sentiment_pie", tallies, render_sentiment_pie_png) if any(tallies) else None
+
+    def top_keywords(self, k=KEYWORD_TOP_K):
+        """Most frequent (word, count) pairs; ties keep first-seen order, exactly like top_keywords()"""
+        if self._top is None or len(self._top) < min(k, len(self.vocabulary)):
+            self._top = self.doc_terms.most_common(max(k, KEYWORD_TOP_K))
+        return self._top[:k]
+
+    def matches(self, word):
+        """Ids of the comments containing ``word``, in comment order"""
+        word_id = self.doc_terms.word_ids.get(word)
+        if word_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self.doc_terms.column_nonzeros(word_id)
+
+    def texts(self, comment_ids):
+        return [str(comment) for comment in self.comments[np.asarray(comment_ids, dtype=np.int64)]]
+
+    def rows(self, comment_ids):
+        """(comment, label, polarity, sentiment_class) tuples for a page of comment ids"""
+        comment_ids = np.asarray(comment_ids, dtype=np.int64)
+        return [
+            (comment, SENTIMENT_LABELS[code], polarity, SENTIMENT_CLASSES[code])
+            for comment, code, polarity in zip(self.texts(comment_ids), self.codes[comment_ids].tolist(), self.polarity[comment_ids].tolist())
+        ]
+
+    def to_frame(self):
+        """The full per-comment results table, built on demand for export"""
+        return pd.DataFrame({
+            "comment": self.comments,
+            "label": pd.Categorical.from_codes(self.codes, SENTIMENT_LABELS),
+            # float32 carries about 7 significant digits; export them without float32 noise
+            "polarity": self.polarity.astype(np.float64).round(6),
+            "sentiment_class": pd.Categorical.from_codes(self.codes, SENTIMENT_CLASSES),
+        })
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the store, chart images and lazily built indexes included (cheap to re-read)"""
+        if self._comments_nbytes is None:
+            self._comments_nbytes = self.comments.nbytes
+            if isinstance(self.comments, np.ndarray):
+                self._comments_nbytes += sum(map(sys.getsizeof, self.comments))
+        total = self._polarity.nbytes + self._codes.nbytes + self.doc_terms.nbytes + self._comments_nbytes
+        total += len(self.wordcloud_png or b"") + len(self.sentiment_pie_png or b"")
+        if self.duplicate_clusters is not None:
+            total += self.duplicate_clusters.nbytes
+        return total
+
+class AnalysisPipeline:
+    """Run each analysis stage exactly once and keep its output for the page to render.
+
+    Stages are parse -> score -> count keywords -> render assets. Progress is
+    reported through ``on_progress(step, percent, message)`` so the caller can
+    drive ``show_loading_animation`` with real per-stage (and per-chunk) progress.
+    When a ``cache`` is given, finished results are stored under a hash of the
+    input bytes and stopwords, and an identical input skips every stage. A
+    ``score_cache`` persists individual comment scores across files and restarts.
+    With ``keyword_budget_mb`` a KeywordSketch of that size picks the top
+    keywords and only those are indexed, instead of every word. Setting
+    ``cancel_event`` stops the run with AnalysisCancelled at the next chunk,
+    and ``partial`` holds running counts for a UI polling from another thread.
+    With ``memory_budget`` (bytes) the run stops with MemoryError at the first
+    chunk where its running size plus ``memory_held`` goes over the budget.
+    """
+
+    def __init__(self, stopwords, engine="textblob", chunk_size=500, parallel=False, workers=None,
+                 on_progress=None, cache=None, chart_cache=None, timer=None, score_cache=None, keyword_budget_mb=None,
+                 cancel_event=None, memory_budget=None, memory_held=0):
+        self.stopwords = stopwords
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+        self.workers = workers
+        self.on_progress = on_progress
+        self.cache = cache
+        self.chart_cache = chart_cache
+        self.timer = timer if timer is not None else StageTimer()
+        self.score_cache = score_cache
+        self.keyword_budget_mb = keyword_budget_mb
+        self.cancel_event = cancel_event
+        self.memory_budget = memory_budget
+        self.memory_held = memory_held
+        self.results = {}
+        self.partial = {"parsed": 0, "scored": 0, "sentiment_counts": (0, 0, 0)}
+
+    def _report(self, step, progress, message):
+        # Every progress report sits on a chunk boundary, which makes it the cancellation point too
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise AnalysisCancelled()
+        if self.memory_budget is not None and self.memory_held > self.memory_budget:
+            raise MemoryError(
+                f"This analysis passed {self.memory_held / MIB:,.1f} MiB after {self.partial['parsed']:,} comments, "
+                f"over the {self.memory_budget / MIB:,.4g} MiB per-session budget (${SESSION_MEMORY_ENV})."
+            )
+        if self.on_progress is not None:
+            self.on_progress(step, int(progress), message)
+
+    def parse(self, uploaded_file):
+        with self.timer.stage("ingest"):
+            comments = self._parse(uploaded_file)
+        self.timer.add_rows("ingest", len(comments))
+        self._report(2, 15, f"📝 Processing {len(comments)} comments...")
+        self.results["comments"] = comments
+        return comments
+
+    def _parse(self, uploaded_file):
+        # The readers stream, but every comment is collected here: scoring dedupes across the whole
+        # input and the store keeps the texts, so peak memory includes the full comment list
+        self.results["source"] = uploaded_file.name if uploaded_file is not None else "sample data"
+        if uploaded_file is not None:
+            self._report(1, 0, "📊 Parsing uploaded data file...")
+            size = getattr(uploaded_file, "size", None)
+            comments = []
+            for chunk in iter_uploaded_comments(uploaded_file):
+                comments.extend(chunk)
+                # The texts and list slots as held during the run (the store packs them tighter afterwards)
+                self.memory_held += sum(map(sys.getsizeof, chunk)) + 8 * len(chunk)
+                self.partial["parsed"] = len(comments)
+                read = min(uploaded_file.tell() / size, 1.0) if size else 0.0
+                self._report(1, 15 * read, f"📊 Parsing uploaded data file... ({len(comments):,} comments)")
+        else:
+            self._report(1, 0, "📊 Generating sample dataset...")
+            comments = create_sample_data()
+            self.memory_held += sum(map(sys.getsizeof, comments)) + 8 * len(comments)
+        return comments
+
+    def score(self):
+        comments = self.results["comments"]
+        self.partial["parsed"] = len(comments)
+        # A float32 polarity and an int8 class per comment
+        self.memory_held += 5 * len(comments)
+
+        def report_chunk(done, total, chunk_sentiments):
+            tally = Counter(sentiment_class for _, _, sentiment_class in chunk_sentiments)
+            positive, negative, neutral = self.partial["sentiment_counts"]
+            self.partial["sentiment_counts"] = (positive + tally["positive"], negative + tally["negative"], neutral + tally["neutral"])
+            self.partial["scored"] = done
+            self._report(3, 15 + 55 * done / total, f"😊 Performing sentiment analysis... ({done}/{total})")
+
+        with self.timer.stage("sentiment", rows=len(comments)):
+            sentiments = score_in_chunks(
+                comments, self.engine, chunk_size=self.chunk_size, parallel=self.parallel, workers=self.workers,
+                on_chunk=report_chunk, score_cache=self.score_cache
+            )
+            polarity = np.fromiter((p for _, p, _ in sentiments), dtype=np.float32, count=len(sentiments))
+            codes = np.fromiter((SENTIMENT_CODES[c] for _, _, c in sentiments), dtype=np.int8, count=len(sentiments))
+        negative, neutral, positive = np.bincount(codes, minlength=len(SENTIMENT_CLASSES)).tolist()
+        self.results["polarity"] = polarity
+        self.results["sentiment_codes"] = codes
+        self.results["sentiment_counts"] = (positive, negative, neutral)
+        return polarity
+
+    def count_keywords(self):
+        self._report(4, 70, "🔑 Extracting keywords and patterns...")
+        comments = self.results["comments"]
+        with self.timer.stage("keyword counting", rows=len(comments)):
+            vocabulary = None
+            if self.keyword_budget_mb:
+                # Pick the heavy hitters in fixed memory, then index only those words
+                sketch = KeywordSketch.for_budget(self.keyword_budget_mb)
+                vocabulary = sketch_vocabulary(comments, self.stopwords, sketch)
+                self.results["keyword_error"] = sketch.error
+                self.results["approximate"] = True
+            doc_terms = DocumentTermMatrix.from_comments(comments, self.stopwords, vocabulary)
+        self.memory_held += doc_terms.nbytes
+        self.results["doc_terms"] = doc_terms
+        self.results["top_keywords"] = doc_terms.most_common(KEYWORD_TOP_K)
+        return doc_terms
+
+    def render_assets(self):
+        self._report(5, 85, "✨ Generating insights and visualizations...")
+        keywords = self.results["top_keywords"]
+        positive_count, negative_count, neutral_count = self.results["sentiment_counts"]
+        with self.timer.stage("chart rendering"):
+            self.results["wordcloud_png"] = (
+                render_chart(self.chart_cache, "wordcloud", keywords, render_wordcloud_png) if keywords else None
+            )
+            tallies = (positive_count, neutral_count, negative_count)
+            self.results["sentiment_pie_png"] = (
+                render_chart(self.chart_cache, "sentiment_pie", tallies, render_sentiment_pie_png) if any(tallies) else None
+            )
+        self.memory_held += len(self.results["wordcloud_png"] or b"") + len(self.results["sentiment_pie_png"] or b"")
+        self._report(5, 100, "✨ Generating insights and visualizations...")
+
+    def build_store(self):
+        """Pack the stage outputs into the compact AnalysisStore the UI reads from"""
+        with self.timer.stage("store packing", rows=len(self.results["comments"])):
+            return AnalysisStore.from_results(self.results)
+
+    def run(self, uploaded_file):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = analysis_cache_key(uploaded_file, self.stopwords, self.engine, self.keyword_budget_mb)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._report(5, 100, "✨ Loaded previous analysis of this file")
+                return cached
+        self.parse(uploaded_file)
+        self.score()
+        self.count_keywords()
+        self.render_assets()
+        store = self.build_store()
+        if cache_key is not None:
+            self.cache.put(cache_key, store)
+        return store
+
+class AnalysisCancelled(Exception):
+    """Raised inside a pipeline run whose cancel event was set"""
+
+class AnalysisJob:
+    """Run an AnalysisPipeline on a background thread so the page stays responsive.
+
+    The UI polls ``progress`` (the latest ``on_progress`` arguments) and
+    ``partial`` and may call ``cancel()``. When the thread ends exactly one of
+    ``result``, ``error`` or ``cancelled`` is set. ``append_to`` carries the
+    store a finished batch should be merged into.
+    """
+
+    def __init__(self, pipeline, uploaded_file, append_to=None):
+        self.pipeline = pipeline
+        self.append_to = append_to
+        self.progress = (1, 0, "📊 Starting analysis...")
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        pipeline.cancel_event = self._cancel
+        pipeline.on_progress = self._on_progress
+        self._thread = threading.Thread(target=self._run, args=(uploaded_file,), name="jurismind-analysis", daemon=True)
+        self._thread.start()
+
+    def _on_progress(self, step, progress, message):
+        self.progress = (step, progress, message)
+
+    def _run(self, uploaded_file):
+        try:
+            self.result = self.pipeline.run(uploaded_file)
+        except AnalysisCancelled:
+            self.cancelled = True
+        except Exception as exc:
+            self.error = exc
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def partial(self):
+        return self.pipeline.partial
+
+    def cancel(self):
+        self._cancel.set()
+
+# -------------------------------
+# Shared Server Resources
+# -------------------------------
+
+MIB = 1024 * 1024
+SESSION_MEMORY_ENV = "JURISMIND_SESSION_MEMORY_MB"
+SERVER_MEMORY_ENV = "JURISMIND_SERVER_MEMORY_MB"
+DEFAULT_SESSION_MEMORY_MB = 512
+DEFAULT_SERVER_MEMORY_MB = 2048
+# Cached analyses are shared by every session; they get this share of the server budget
+ANALYSIS_CACHE_MEMORY_SHARE = 0.25
+
+_process_resources = {}
+
+def process_resource(factory):
+    """The one instance of ``factory()`` for this server process, shared by every session.
+
+    Streamlit re-executes this module on each rerun, so a module global would be
+    rebuilt every time; st.cache_resource keeps a single instance for the life
+    of the server. The CLI and benchmarks never import Streamlit and memoise in
+    a plain dict instead.
+    """
+    if "streamlit" in sys.modules:
+        return st.cache_resource(factory, show_spinner=False)()
+    if factory not in _process_resources:
+        _process_resources[factory] = factory()
+    return _process_resources[factory]
+
+def memory_budget_bytes(env, default_mb):
+    """A MiB budget from the environment, falling back to ``default_mb`` when unset or malformed"""
+    try:
+        megabytes = float(os.environ.get(env, default_mb))
+    except ValueError:
+        megabytes = default_mb
+    return int(megabytes * MIB)
+
+class SessionMemory:
+    """Process-wide owner of every session's analysis, with per-session and server budgets.
+
+    Session state keeps only a session id and the store lives here, so evicting
+    an idle session really frees its results. Sessions are kept in
+    least-recently-active order; when the total held goes over ``server_budget``
+    the idlest sessions lose their results, never the session storing. Sizes
+    come from ``AnalysisStore.nbytes``; a cached store shared by two sessions is
+    counted against both. Over-budget errors are plain MemoryError: the instance
+    outlives the rerun that defined it, so a class from this module would not
+    match the ``except`` clause of later reruns.
+    """
+
+    def __init__(self, session_budget, server_budget):
+        self.session_budget = session_budget
+        self.server_budget = server_budget
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def touch(self, session_id):
+        """Mark the session active and return its analysis, or None if it has none or it was evicted.
+
+        The store is re-measured on the way, so indexes it built lazily since
+        the last rerun are accounted for.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            self._account(session_id, entry[0])
+            return entry[0]
+
+    def check(self, nbytes):
+        """Raise MemoryError unless ``nbytes`` fits one session's budget"""
+        if nbytes > self.session_budget:
+            raise MemoryError(
+                f"This analysis needs {nbytes / MIB:,.1f} MiB, over the {self.session_budget / MIB:,.4g} MiB "
+                f"per-session budget (${SESSION_MEMORY_ENV})."
+            )
+
+    def hold(self, session_id, store):
+        """Keep ``store`` as the session's analysis, evicting idle sessions to stay within the server budget.
+
+        A new store must fit the session budget. The store the session already
+        holds (merged into in place) is only re-measured: callers check
+        ``check(current.nbytes + batch.nbytes)`` before mutating it.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0] is not store:
+                self.check(store.nbytes)
+            self._account(session_id, store)
+
+    def _account(self, session_id, store):
+        nbytes = store.nbytes
+        self._release(session_id)
+        self._sessions[session_id] = (store, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.server_budget:
+            idlest = next(iter(self._sessions))
+            if idlest == session_id:
+                break
+            self._release(idlest)
+
+    def release(self, session_id):
+        with self._lock:
+            self._release(session_id)
+
+    def _release(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def usage(self, session_id):
+        entry = self._sessions.get(session_id)
+        return entry[1] if entry is not None else 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+def _new_session_memory():
+    return SessionMemory(
+        memory_budget_bytes(SESSION_MEMORY_ENV, DEFAULT_SESSION_MEMORY_MB),
+        memory_budget_bytes(SERVER_MEMORY_ENV, DEFAULT_SERVER_MEMORY_MB)
+    )
+
+def _new_analysis_cache():
+    max_bytes = int(memory_budget_bytes(SERVER_MEMORY_ENV, DEFAULT_SERVER_MEMORY_MB) * ANALYSIS_CACHE_MEMORY_SHARE)
+    return LRUCache(ANALYSIS_CACHE_MAX_ENTRIES, ttl=ANALYSIS_CACHE_TTL_SECONDS, max_bytes=max_bytes,
+                    sizeof=lambda store: store.nbytes)
+
+def _new_chart_cache():
+    return LRUCache(CHART_CACHE_MAX_ENTRIES)
+
+def session_memory():
+    return process_resource(_new_session_memory)
+
+def shared_analysis_cache():
+    """Analyses keyed by file content and settings, so sessions analysing the same file share one store"""
+    return process_resource(_new_analysis_cache)
+
+def shared_chart_cache():
+    return process_resource(_new_chart_cache)
+
+# -------------------------------
+# Headless Batch CLI
+# -------------------------------
+
+def build_cli_parser():
+    parser = argparse.ArgumentParser(
+        prog="app.py",
+        description="Run the JurisMind analysis on a file without the Streamlit UI."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    analyze = commands.add_parser("analyze", help="Analyze a CSV, Excel or text file of comments")
+    analyze.add_argument("input", help="Path to a .csv, .txt, .xlsx or .xls file")
+    analyze.add_argument("--out", help="Write per-comment results to a .csv or .parquet file")
+    analyze.add_argument("--wordcloud", help="Write the keyword word cloud to a PNG file")
+    analyze.add_argument("--engine", choices=list(SENTIMENT_ENGINES), default="lexicon",
+                         help="Sentiment engine (default: lexicon)")
+    analyze.add_argument("--workers", type=int, default=available_cpus(),
+                         help="Worker processes for sentiment scoring (default: cores available to this process)")
+    analyze.add_argument("--top", type=int, default=15, help="Number of top keywords to print")
+    analyze.add_argument("--keyword-budget", type=float, metavar="MIB",
+                         help="Count keywords approximately within this many MiB instead of exactly")
+    analyze.add_argument("--no-score-cache", action="store_true",
+                         help=f"Do not read or write the persistent score cache (${SCORE_CACHE_ENV})")
+    analyze.add_argument("--quiet", action="store_true", help="Do not print progress to stderr")
+    return parser
+
+def run_cli(argv=None):
+    """Entry point for ``python app.py analyze ...``; returns the process exit code"""
+    args = build_cli_parser().parse_args(argv)
+
+    def report_progress(step, progress, message):
+        if not args.quiet:
+            print(f"[{progress:3d}%] {message}", file=sys.stderr)
+
+    # Ingestion silently yields nothing for other types; fail loudly so a batch job never reports 0 comments as success
+    if not args.input.endswith(SUPPORTED_EXTENSIONS):
+        print(f"error: unsupported file type for {args.input}; expected one of {', '.join(SUPPORTED_EXTENSIONS)}", file=sys.stderr)
+        return 1
+
+    pipeline = AnalysisPipeline(
+        stopwords, engine=args.engine, chunk_size=2000, parallel=args.workers > 1, workers=args.workers,
+        on_progress=report_progress, score_cache=None if args.no_score_cache else default_score_cache(),
+        keyword_budget_mb=args.keyword_budget
+    )
+    try:
+        with open(args.input, "rb") as input_file:
+            pipeline.parse(input_file)
+    except OSError as exc:
+        print(f"error: cannot read {args.input}: {exc}", file=sys.stderr)
+        return 1
+    pipeline.score()
+    pipeline.count_keywords()
+    store = pipeline.build_store()
+    table = store.to_frame()
+
+    if args.out:
+        if args.out.endswith(".parquet"):
+            table.to_parquet(args.out, index=False)
+        else:
+            table.to_csv(args.out, index=False)
+    keywords = store.top_keywords()
+    if args.wordcloud and keywords:
+        with open(args.wordcloud, "wb") as image_file:
+            image_file.write(render_wordcloud_png(keywords))
+
+    positive_count, negative_count, neutral_count = store.sentiment_counts
+    print(f"Total comments: {len(store)}")
+    print(f"Positive: {positive_count}  Neutral: {neutral_count}  Negative: {negative_count}")
+    if pipeline.score_cache is not None and pipeline.score_cache.hits + pipeline.score_cache.misses:
+        print(f"Score cache: {pipeline.score_cache.hits} reused, {pipeline.score_cache.misses} scored")
+    if store.keyword_error:
+        print(f"Keyword list is approximate: picked by a sketch that may undercount by up to {store.keyword_error}; counts shown are exact")
+    for word, freq in keywords[:args.top]:
+        print(f"{word}\t{freq}")
+    return 0
+
 # -------------------------------
 # Enhanced Streamlit UI
 # -------------------------------
 
-def main():
+PAGE_SIZES = [10, 20, 50, 100]
+DEFAULT_PAGE_SIZE = 20
+
+def page_bounds(total, page_size, page):
+    """Clamp a 1-based page cursor and return (start, stop, page, page_count) for slicing"""
+    page_count = max(1, -(-total // page_size))
+    page = min(max(1, page), page_count)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total), page, page_count
+
+def render_pager(key, total):
+    """Page-size and page-cursor controls for a list of ``total`` rows; returns the visible (start, stop)"""
+    size_key, page_key = f"{key}_page_size", f"{key}_page"
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=size_key)
+    # Clamp the cursor before the widget exists: a smaller result set or a bigger page size can shrink the page count
+    start, stop, page, page_count = page_bounds(total, page_size, st.session_state.get(page_key, 1))
+    st.session_state[page_key] = page
+    with col2:
+        st.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, step=1, key=page_key)
+    st.caption(f"Showing {start + 1:,}–{stop:,} of {total:,}" if total else "Nothing to show")
+    return start, stop
+
+def render_performance_panel(timer):
+    """Sidebar panel with this rerun's stage timings, the last analysis timings and cProfile output"""
+    with st.sidebar:
+        st.markdown("### ⏱️ Performance")
+        if not st.checkbox("Show stage timings", key="show_timings"):
+            return
+        st.markdown("**This rerun**")
+        st.dataframe(pd.DataFrame(timer.rows(), columns=["stage", "ms", "calls", "rows"]), hide_index=True)
+        if st.session_state.get("analysis_timings"):
+            st.markdown("**Last analysis**")
+            st.dataframe(pd.DataFrame(st.session_state.analysis_timings, columns=["stage", "ms", "calls", "rows"]), hide_index=True)
+        st.checkbox("Profile reruns with cProfile", key="profile_reruns")
+        if st.session_state.get("last_profile"):
+            data, summary = st.session_state.last_profile
+            st.download_button(
+                label="📥 Download .pstats",
+                data=data,
+                file_name="jurismind_profile.pstats",
+                mime="application/octet-stream",
+                use_container_width=True,
+                key="profile_download_btn"
+            )
+            with st.expander("Top functions by cumulative time"):
+                st.code(summary)
+
+def render_job_progress():
+    """Poll the session's background job twice a second without re-running the rest of the page"""
+
+    @st.fragment(run_every=0.5)
+    def job_progress():
+        job = st.session_state.get("job")
+        if job is None or not job.running:
+            # Finished (or gone): a full rerun collects the result
+            st.rerun()
+        show_loading_animation(*job.progress)
+        partial = job.partial
+        positive_count, negative_count, neutral_count = partial["sentiment_counts"]
+        st.caption(
+            f"{partial['parsed']:,} comments read · {partial['scored']:,} distinct texts scored so far "
+            f"(😊 {positive_count:,} · 😐 {neutral_count:,} · 😞 {negative_count:,})"
+        )
+        if st.button("⏹️ Cancel analysis", key="cancel_btn", use_container_width=True):
+            job.cancel()
+
+    job_progress()
+
+def run_app():
+    """Run the dashboard with per-stage timing and, when enabled, a cProfile capture of the rerun"""
+    timer = StageTimer()
+    profiler = cProfile.Profile() if st.session_state.get("profile_reruns") else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        main(timer)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            st.session_state.last_profile = profile_report(profiler)
+    render_performance_panel(timer)
+
+def main(timer=None):
+    timer = timer if timer is not None else StageTimer()
+    
     # Inject custom CSS
     inject_custom_css()
     
@@ -777,14 +2511,106 @@ def main():
     st.markdown('<p class="sub-header">Advanced sentiment analysis, keyword extraction, and interactive visualizations for customer feedback</p>', unsafe_allow_html=True)
     
     # Initialize session state
-    if "comments" not in st.session_state:
-        st.session_state.comments = []
     if "processing" not in st.session_state:
         st.session_state.processing = False
     if "selected_word" not in st.session_state:
         st.session_state.selected_word = None
     if "file_processed" not in st.session_state:
         st.session_state.file_processed = False
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "job" not in st.session_state:
+        st.session_state.job = None
+    
+    # The analysis itself is held server-wide so idle sessions' results can be evicted under memory pressure
+    memory = session_memory()
+    session_id = st.session_state.session_id
+    analysis = memory.touch(session_id)
+    if analysis is None and st.session_state.file_processed:
+        st.session_state.file_processed = False
+        st.info("🧹 This session's results were freed while it sat idle and the server needed the memory. Run the analysis again to restore them.")
+    
+    # Analysis settings
+    with st.sidebar:
+        st.markdown("### ⚙️ Analysis Settings")
+        sentiment_engine = st.selectbox(
+            "Sentiment engine",
+            options=list(SENTIMENT_ENGINES),
+            format_func=SENTIMENT_ENGINES.get,
+            key="sentiment_engine",
+            help="The fast lexicon engine scores the whole upload in one batch and matches TextBlob's polarity scores."
+        )
+        parallel_scoring = st.checkbox(
+            "Parallel scoring (multi-core)",
+            key="parallel_scoring",
+            help=f"Split large uploads into chunks scored across {available_cpus()} cores. Uploads under {PARALLEL_MIN_COMMENTS:,} comments are scored in-process."
+        )
+        collapse_duplicates = st.checkbox(
+            "Collapse near-duplicate comments",
+            key="collapse_duplicates",
+            help="Group templated and copy-pasted feedback (MinHash over word 3-grams) and show one comment per group."
+        )
+        approximate_keywords = st.checkbox(
+            "Approximate keyword counting",
+            key="approximate_keywords",
+            help="Pick the top keywords in fixed memory with a heavy-hitters sketch and index only those words, instead of indexing every word."
+        )
+        keyword_budget_mb = None
+        if approximate_keywords:
+            keyword_budget_mb = st.number_input(
+                "Keyword memory budget (MiB)", min_value=0.25, max_value=256.0, value=4.0, step=0.25,
+                key="keyword_budget_mb"
+            )
+    
+    # Collect a finished background job before drawing anything that depends on the current analysis
+    job = st.session_state.job
+    if job is not None and not job.running:
+        st.session_state.job = None
+        st.session_state.processing = False
+        if isinstance(job.error, MemoryError):
+            st.error(f"❌ {job.error} The previous results are unchanged.")
+        elif job.error is not None:
+            st.error(f"❌ Analysis failed: {job.error}")
+        elif job.cancelled:
+            st.info("⏹️ Analysis cancelled. The previous results are unchanged.")
+        elif len(job.result) == 0:
+            # Header-only CSVs, blank text files and empty sheets: keep (or return to) the empty state, not a 0-comment dashboard
+            if job.append_to is None:
+                memory.release(session_id)
+                analysis = None
+                st.session_state.file_processed = False
+                st.info("📭 No comments found in this file. Check that it has a comment column or one comment per line.")
+            else:
+                st.info("📭 No comments found in this file, so there was nothing to append. The current analysis is unchanged.")
+        else:
+            result = job.result
+            st.session_state.analysis_timings = job.pipeline.timer.rows()
+            try:
+                if job.append_to is not None:
+                    # Later merges extend the held store in place, so the budget is checked before anything changes
+                    memory.check(job.append_to.nbytes + result.nbytes)
+                    with job.pipeline.timer.stage("batch merge", rows=len(result)):
+                        # The first merge copies the (possibly shared) store; later merges extend the session's own copy
+                        merged = job.append_to if len(job.append_to.sources) > 1 else job.append_to.copy()
+                        result = merged.append(result, chart_cache=shared_chart_cache())
+                    st.session_state.analysis_timings = job.pipeline.timer.rows()
+                memory.hold(session_id, result)
+            except MemoryError as exc:
+                st.error(f"❌ {exc}")
+            else:
+                analysis = result
+                st.session_state.file_processed = True
+                st.session_state.selected_word = None
+                st.session_state.comments_page = 1
+                st.session_state.matches_page = 1
+                st.success("✅ Analysis completed successfully!")
+    
+    with st.sidebar:
+        st.caption(
+            f"🧠 This session holds {memory.usage(session_id) / MIB:,.1f} of {memory.session_budget / MIB:,.4g} MiB · "
+            f"{memory.nbytes / MIB:,.0f} of {memory.server_budget / MIB:,.4g} MiB in use across {len(memory):,} "
+            f"session{'s' if len(memory) != 1 else ''}"
+        )
     
     # File upload section
     with st.container():
@@ -793,65 +2619,39 @@ def main():
         
         uploaded_file = st.file_uploader(
             "Choose a file", 
-            type=['csv', 'txt', 'xlsx', 'xls'],
+            type=[extension.lstrip(".") for extension in SUPPORTED_EXTENSIONS],
             label_visibility="collapsed"
         )
         
-        if st.button("🚀 Analyze Data", use_container_width=True, key="analyze_btn"):
-            st.session_state.processing = True
-            st.session_state.comments = []
-            st.session_state.selected_word = None
-            
-            placeholder = st.empty()
-            
-            if uploaded_file is not None:
-                with placeholder.container():
-                    show_loading_animation(1, 20, "📊 Parsing uploaded data file...")
-                time.sleep(1.5)
-                
-                comments = process_uploaded_file(uploaded_file)
-                
-                with placeholder.container():
-                    show_loading_animation(2, 40, "📝 Processing comments...")
-                time.sleep(1.5)
-                
-            else:
-                with placeholder.container():
-                    show_loading_animation(1, 20, "📊 Generating sample dataset...")
-                time.sleep(1.5)
-                
-                comments = create_sample_data()
-                
-                with placeholder.container():
-                    show_loading_animation(2, 40, "📝 Processing sample comments...")
-                time.sleep(1.5)
-            
-            with placeholder.container():
-                show_loading_animation(3, 60, "😊 Performing sentiment analysis...")
-            time.sleep(1.5)
-            
-            with placeholder.container():
-                show_loading_animation(4, 80, "🔑 Extracting keywords and patterns...")
-            time.sleep(1.5)
-            
-            with placeholder.container():
-                show_loading_animation(5, 100, "✨ Generating insights and visualizations...")
-            time.sleep(1.5)
-            
-            st.session_state.comments = comments
-            st.session_state.file_processed = True
-            st.session_state.processing = False
-            placeholder.empty()
-            st.success("✅ Analysis completed successfully!")
-            st.rerun()
-    
+        current = analysis
+        can_append = current is not None and not current.approximate and not keyword_budget_mb
+        append_batch = st.checkbox(
+            "➕ Append to current analysis",
+            key="append_batch",
+            disabled=not can_append,
+            help="Analyse only the new file and merge it into the current results instead of starting over. Needs exact keyword counting."
+        ) and can_append
+        
+        if st.button("🚀 Analyze Data", use_container_width=True, key="analyze_btn", disabled=st.session_state.job is not None):
+            # At most one job per session: the button is disabled while one runs, and a stale click is ignored
+            if st.session_state.job is None:
+                pipeline = AnalysisPipeline(
+                    stopwords, engine=sentiment_engine, parallel=parallel_scoring,
+                    cache=shared_analysis_cache(), chart_cache=shared_chart_cache(),
+                    score_cache=default_score_cache(), keyword_budget_mb=keyword_budget_mb,
+                    # Stop at the first chunk that outgrows the session budget instead of after the whole file
+                    memory_budget=memory.session_budget, memory_held=current.nbytes if append_batch else 0
+                )
+                st.session_state.job = AnalysisJob(pipeline, uploaded_file, append_to=current if append_batch else None)
+                st.session_state.processing = True
+                st.rerun()
+        
     if st.session_state.processing:
-        show_loading_animation(1, 50, "Processing your data...")
+        render_job_progress()
     
-    if st.session_state.comments and not st.session_state.processing:
-        comments = st.session_state.comments
-        word_counts = preprocess_text(comments, stopwords)
-        positive_count, negative_count, neutral_count = get_sentiment_stats(comments)
+    if analysis is not None and len(analysis) and not st.session_state.processing:
+        keywords = analysis.top_keywords()
+        positive_count, negative_count, neutral_count = analysis.sentiment_counts
         
         st.markdown('<div style="margin: 3rem 0;">', unsafe_allow_html=True)
         col1, col2, col3, col4 = st.columns(4)
@@ -860,7 +2660,7 @@ def main():
             st.markdown(f'''
             <div class="metric-card">
                 <h3>📊 Total Comments</h3>
-                <h2>{len(comments)}</h2>
+                <h2>{len(analysis)}</h2>
             </div>
             ''', unsafe_allow_html=True)
         
@@ -889,6 +2689,21 @@ def main():
             ''', unsafe_allow_html=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
+        if len(analysis.sources) > 1:
+            st.caption(f"Merged batches: {', '.join(analysis.sources)}")
+        
+        # Near-duplicate clusters are computed on first use and kept with the analysis
+        clusters = None
+        if collapse_duplicates:
+            if analysis.duplicate_clusters is None:
+                with timer.stage("near-duplicate clustering", rows=len(analysis)):
+                    analysis.duplicate_clusters = near_duplicate_clusters(analysis.texts(range(len(analysis))))
+            clusters = analysis.duplicate_clusters
+            cluster_sizes = np.bincount(clusters, minlength=len(clusters))
+        
+        def similar_note(comment_id):
+            extra = similar_count(comment_id, clusters, cluster_sizes) if clusters is not None else 0
+            return f" · +{extra} similar" if extra else ""
         
         tab1, tab2, tab3 = st.tabs(["📝 Comments Analysis", "🔑 Keyword Explorer", "📊 Visualizations"])
         
@@ -897,40 +2712,28 @@ def main():
             col1, col2 = st.columns([1, 1], gap="large")
             
             with col1:
-                if comments:
-                    with st.container(height=600):
-                        for i, comment in enumerate(comments[:20]):
-                            sentiment_text, polarity, sentiment_class = analyze_sentiment(comment)
-                            st.markdown(f'''
-                            <div class="comment-item">
-                                <div style="font-size: 0.9rem; color: var(--text-secondary); margin-bottom: 0.8rem; display: flex; justify-content: space-between;">
-                                    <span>Comment #{i+1}</span>
-                                    <span>Polarity: {polarity:.3f}</span>
+                if len(analysis):
+                    comment_ids = range(len(analysis)) if clusters is None else cluster_representatives(range(len(analysis)), clusters)
+                    start, stop = render_pager("comments", len(comment_ids))
+                    with timer.stage("comment rendering", rows=stop - start):
+                        with st.container(height=600):
+                            page_ids = comment_ids[start:stop]
+                            for comment_id, (comment, sentiment_text, polarity, sentiment_class) in zip(page_ids, analysis.rows(page_ids)):
+                                st.markdown(f'''
+                                <div class="comment-item">
+                                    <div style="font-size: 0.9rem; color: var(--text-secondary); margin-bottom: 0.8rem; display: flex; justify-content: space-between;">
+                                        <span>Comment #{comment_id+1}{similar_note(comment_id)}</span>
+                                        <span>Polarity: {polarity:.3f}</span>
+                                    </div>
+                                    <div style="color: var(--text-primary); font-size: 1.1rem; line-height: 1.7; margin: 1.2rem 0; font-weight: 500;">{comment}</div>
+                                    <div class="sentiment-badge {sentiment_class}">{sentiment_text}</div>
                                 </div>
-                                <div style="color: var(--text-primary); font-size: 1.1rem; line-height: 1.7; margin: 1.2rem 0; font-weight: 500;">{comment}</div>
-                                <div class="sentiment-badge {sentiment_class}">{sentiment_text}</div>
-                            </div>
-                            ''', unsafe_allow_html=True)
+                                ''', unsafe_allow_html=True)
             
             with col2:
                 st.markdown('<div class="section-header">Sentiment Distribution</div>', unsafe_allow_html=True)
-                
-                fig, ax = plt.subplots(figsize=(10, 8), facecolor='#0a0a0a')
-                sentiments = [positive_count, neutral_count, negative_count]
-                labels = ['Positive', 'Neutral', 'Negative']
-                colors = ['#10b981', '#f59e0b', '#ef4444']
-                explode = (0.05, 0.02, 0.05)
-                
-                ax.pie(
-                    sentiments, explode=explode, labels=labels, colors=colors, 
-                    autopct='%1.1f%%', startangle=90, shadow=True,
-                    textprops={'color': 'white', 'fontsize': 12, 'fontweight': 'bold'}
-                )
-                
-                ax.axis('equal')
-                plt.title('Sentiment Distribution', fontsize=16, fontweight='bold', pad=30, color='white')
-                plt.tight_layout()
-                st.pyplot(fig)
+                with timer.stage("chart rendering"):
+                    st.image(analysis.sentiment_pie_png, use_container_width=True)
         
         with tab2:
             st.markdown('<div class="section-header">Keyword Explorer</div>', unsafe_allow_html=True)
@@ -938,36 +2741,41 @@ def main():
             
             with col1:
                 st.markdown('### 📋 Keyword List')
-                keywords = list(word_counts.items())[:30]
-                max_freq = max([f for _, f in keywords]) if keywords else 0
+                if analysis.keyword_error:
+                    st.caption(f"Approximate keyword list: picked by a sketch that may undercount by up to {analysis.keyword_error:,}, so a borderline word can be missing. The counts shown are exact.")
+                max_freq = keywords[0][1] if keywords else 0
 
                 with st.container(height=600):
                     # Use Streamlit buttons to update state directly
-                    for i, (word, freq) in enumerate(keywords):
+                    for i, (word, freq) in enumerate(keywords[:30]):
                         if st.button(f"{word.capitalize()} ({freq})", key=f"btn_{word}", use_container_width=True):
                             st.session_state.selected_word = word
+                            st.session_state.matches_page = 1
                             st.rerun()
             
             with col2:
                 if st.session_state.selected_word:
                     st.markdown(f'<div class="section-header">Comments containing: "{st.session_state.selected_word}"</div>', unsafe_allow_html=True)
                     
-                    # Filter comments using a case-insensitive check
-                    matching_comments = [c for c in comments if st.session_state.selected_word.lower() in c.lower()]
+                    # Look up matching comments in the keyword index and render only the visible page
+                    matching_ids = analysis.matches(st.session_state.selected_word)
+                    if len(matching_ids) and clusters is not None:
+                        matching_ids = cluster_representatives(matching_ids, clusters)
                     
-                    if matching_comments:
-                        with st.container(height=600):
-                            for i, comment in enumerate(matching_comments):
-                                highlighted_comment = highlight_word(comment, st.session_state.selected_word)
-                                sentiment_text, polarity, sentiment_class = analyze_sentiment(comment)
-                                
-                                st.markdown(f'''
-                                <div class="comment-item">
-                                    <div style="font-size: 0.9rem; color: var(--text-secondary); margin-bottom: 0.8rem;">Match #{i+1}</div>
-                                    <div style="color: var(--text-primary); font-size: 1.1rem; line-height: 1.7; margin: 1.2rem 0; font-weight: 500;">{highlighted_comment}</div>
-                                    <div class="sentiment-badge {sentiment_class}">{sentiment_text} (Pol: {polarity:.3f})</div>
-                                </div>
-                                ''', unsafe_allow_html=True)
+                    if len(matching_ids):
+                        start, stop = render_pager("matches", len(matching_ids))
+                        matching_rows = analysis.rows(matching_ids[start:stop])
+                        with timer.stage("comment rendering", rows=len(matching_rows)):
+                            with st.container(height=600):
+                                highlighted_comments = highlight_keywords([row[0] for row in matching_rows], [st.session_state.selected_word])
+                                for i, (comment_id, highlighted_comment, (comment, sentiment_text, polarity, sentiment_class)) in enumerate(zip(matching_ids[start:stop].tolist(), highlighted_comments, matching_rows), start=start):
+                                    st.markdown(f'''
+                                    <div class="comment-item">
+                                        <div style="font-size: 0.9rem; color: var(--text-secondary); margin-bottom: 0.8rem;">Match #{i+1}{similar_note(comment_id)}</div>
+                                        <div style="color: var(--text-primary); font-size: 1.1rem; line-height: 1.7; margin: 1.2rem 0; font-weight: 500;">{highlighted_comment}</div>
+                                        <div class="sentiment-badge {sentiment_class}">{sentiment_text} (Pol: {polarity:.3f})</div>
+                                    </div>
+                                    ''', unsafe_allow_html=True)
                     else:
                         st.info("No comments found containing this keyword.")
                 else:
@@ -981,36 +2789,16 @@ def main():
             with col1:
                 st.markdown('<div class="section-header">Word Cloud Visualization</div>', unsafe_allow_html=True)
                 
-                if word_counts:
-                    wc = WordCloud(
-                        width=1200, 
-                        height=600, 
-                        background_color=None,
-                        mode="RGBA",
-                        colormap="plasma",
-                        max_words=150,
-                        relative_scaling=0.5,
-                        collocations=False,
-                        prefer_horizontal=0.7,
-                        min_font_size=10,
-                        max_font_size=150,
-                        random_state=42
-                    ).generate_from_frequencies(word_counts)
-                    
-                    fig, ax = plt.subplots(figsize=(14, 7), facecolor='#0a0a0a')
-                    ax.imshow(wc, interpolation="bilinear")
-                    ax.axis("off")
-                    ax.set_title("Keyword Frequency Cloud", fontsize=20, pad=20, fontweight='bold', color='white')
-                    fig.patch.set_facecolor('#0a0a0a')
-                    plt.tight_layout()
-                    st.pyplot(fig, use_container_width=True)
+                if analysis.wordcloud_png is not None:
+                    with timer.stage("chart rendering"):
+                        st.image(analysis.wordcloud_png, use_container_width=True)
             
             with col2:
                 st.markdown('<div class="section-header">Top 15 Keywords</div>', unsafe_allow_html=True)
                 
-                if word_counts:
+                if keywords:
                     with st.container(height=600):
-                        for word, freq in list(word_counts.items())[:15]:
+                        for word, freq in keywords[:15]:
                             st.markdown(f'''
                             <div style="padding: 1.2rem; margin: 0.8rem 0; background: rgba(30, 30, 46, 0.7); border-radius: 12px; border-left: 4px solid #667eea; backdrop-filter: blur(15px);">
                                 <div style="font-weight: 700; color: var(--text-primary); font-size: 1.1rem; margin-bottom: 0.3rem;">{word.capitalize()}</div>
@@ -1023,12 +2811,9 @@ def main():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            df = pd.DataFrame({
-                'comment': comments,
-                'sentiment': [analyze_sentiment(comment)[0] for comment in comments],
-                'polarity': [analyze_sentiment(comment)[1] for comment in comments]
-            })
-            csv = df.to_csv(index=False)
+            with timer.stage("export build", rows=len(analysis)):
+                df = analysis.to_frame()[["comment", "label", "polarity"]].rename(columns={"label": "sentiment"})
+                csv = df.to_csv(index=False)
             st.download_button(
                 label="💾 Export Full Analysis to CSV",
                 data=csv,
@@ -1040,17 +2825,17 @@ def main():
         
         with col2:
             if st.button("🔄 Reset & Clear Analysis", key="reset_btn", use_container_width=True):
-                st.session_state.comments = []
+                memory.release(session_id)
                 st.session_state.file_processed = False
                 st.rerun()
         
         with col3:
             if st.button("📊 Analyze New Data", key="new_analysis_btn", use_container_width=True):
-                st.session_state.comments = []
+                memory.release(session_id)
                 st.session_state.file_processed = False
                 st.rerun()
     
-    elif not st.session_state.comments and not st.session_state.processing:
+    elif not st.session_state.processing:
         st.markdown('''
         <div class="empty-state">
             <h3 style="color: var(--text-primary); margin-bottom: 2rem; font-size: 2.2rem; background: var(--primary-gradient); -webkit-background-clip: text; -webkit-text-fill-color: transparent; font-weight: 800;">🚀 Ready to Analyze Customer Feedback?</h3>
@@ -1081,4 +2866,6 @@ def main():
         ''', unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        sys.exit(run_cli(sys.argv[1:]))
+    run_app()
\ No newline at end of file
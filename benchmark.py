@@ -0,0 +1,239 @@
+"""Benchmark the JurisMind analysis stages on synthetic corpora.
+
+Examples:
+    python benchmark.py --sizes 10000 100000 --out bench.json
+    python benchmark.py --sizes 10000 --baseline bench.json --tolerance 0.25
+    python benchmark.py --sizes 1000 --import-budget 0.3
+    python benchmark.py --sizes 50000 --excel
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import app
+
+# -------------------------------
+# Synthetic Corpus
+# -------------------------------
+
+def load_seed_comments():
+    """Seed phrases: the built-in sample data plus the shipped sample_comments.csv"""
+    comments = list(app.create_sample_data())
+    sample_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_comments.csv")
+    if os.path.exists(sample_path):
+        with open(sample_path, newline="", encoding="utf-8") as sample_file:
+            comments.extend(row["comment"] for row in csv.DictReader(sample_file) if row.get("comment"))
+    return comments
+
+def generate_corpus(size, vocabulary=0, seed=0):
+    """Build a reproducible corpus of ``size`` comments from recombined seed sentences.
+
+    With ``vocabulary > 0`` each comment also gets a few synthetic terms drawn
+    from a Zipf-like distribution over that many distinct words, which grows the
+    keyword vocabulary the way typos, IDs and product names do in real exports.
+    """
+    rng = random.Random(seed)
+    sentences = [s.strip() for c in load_seed_comments() for s in re.split(r"(?<=[.!?])\s+", c) if s.strip()]
+    weights = [1.0 / rank for rank in range(1, vocabulary + 1)]
+    terms = [f"term{rank}" for rank in range(1, vocabulary + 1)]
+    corpus = []
+    for _ in range(size):
+        comment = " ".join(rng.choice(sentences) for _ in range(rng.randint(1, 3)))
+        if vocabulary:
+            comment += " " + " ".join(rng.choices(terms, weights=weights, k=rng.randint(1, 3)))
+        corpus.append(comment)
+    return corpus
+
+def write_corpus_xlsx(corpus, directory, extra_columns=3):
+    """Write the corpus as an .xlsx export laid out like the CSV one"""
+    path = os.path.join(directory, f"corpus_{len(corpus)}.xlsx")
+    frame = app.pd.DataFrame({f"meta_{i}": range(len(corpus)) for i in range(extra_columns)})
+    frame["comment"] = corpus
+    frame.to_excel(path, index=False)
+    return path
+
+def write_corpus_csv(corpus, directory, extra_columns=3):
+    """Write the corpus as a CSV export with a few metadata columns next to the comments"""
+    path = os.path.join(directory, f"corpus_{len(corpus)}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as corpus_file:
+        writer = csv.writer(corpus_file)
+        writer.writerow([f"meta_{i}" for i in range(extra_columns)] + ["comment"])
+        for row_id, comment in enumerate(corpus):
+            writer.writerow([row_id] * extra_columns + [comment])
+    return path
+
+# -------------------------------
+# Stage Timing
+# -------------------------------
+
+def measure(func, memory=True):
+    """Return (result, wall seconds, peak traced MiB) for one call of ``func``"""
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+def measure_import_time(runs=3):
+    """Best-of-``runs`` wall time to import app in a fresh interpreter"""
+    code = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+def warm_up(engines, workdir, excel=False):
+    """Run every stage once on a tiny corpus, untimed.
+
+    app imports pandas, matplotlib, wordcloud and TextBlob lazily, so the first
+    stage to touch each would otherwise pay its import (and font or lexicon
+    loading) inside the timed call. Import cost is reported only by the
+    separate "import app" record.
+    """
+    benchmark_size(50, engines, 0, 0, workdir, memory=False, excel=excel)
+
+def benchmark_size(size, engines, vocabulary, seed, workdir, memory=True, excel=False):
+    """Time every analysis stage on a corpus of ``size`` comments"""
+    corpus = generate_corpus(size, vocabulary=vocabulary, seed=seed)
+    csv_path = write_corpus_csv(corpus, workdir)
+    records = []
+
+    def record(stage, func, rows):
+        result, seconds, peak_mb = measure(func, memory=memory)
+        records.append({
+            "size": size,
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(rows / seconds, 1) if seconds else None,
+            "peak_mb": round(peak_mb, 3) if peak_mb is not None else None,
+        })
+        return result
+
+    def parse_csv():
+        with open(csv_path, "rb") as csv_file:
+            return app.process_uploaded_file(csv_file)
+
+    record("process_uploaded_file", parse_csv, size)
+    if excel:
+        xlsx_path = write_corpus_xlsx(corpus, workdir)
+
+        def parse_xlsx(reader):
+            with open(xlsx_path, "rb") as xlsx_file:
+                return reader(xlsx_file)
+
+        record("read_excel_comments[legacy]", lambda: parse_xlsx(app.read_excel_comments), size)
+        record("process_uploaded_file[xlsx]", lambda: parse_xlsx(app.process_uploaded_file), size)
+
+    # The remaining stages run the same AnalysisPipeline and AnalysisStore export the app ships
+    for engine in engines:
+        pipeline = app.AnalysisPipeline(app.stopwords, engine=engine)
+        with open(csv_path, "rb") as csv_file:
+            pipeline.parse(csv_file)
+        record(f"AnalysisPipeline.score[{engine}]", pipeline.score, size)
+    record("AnalysisPipeline.count_keywords", pipeline.count_keywords, size)
+    keywords = pipeline.results["top_keywords"]
+    record("wordcloud", lambda: app.render_wordcloud_png(keywords), size)
+    store = record("AnalysisPipeline.build_store", pipeline.build_store, size)
+    record("export", lambda: store.to_frame().to_csv(index=False), size)
+    return records
+
+# -------------------------------
+# Baseline Comparison
+# -------------------------------
+
+def compare_to_baseline(records, baseline, tolerance):
+    """Return human-readable regressions where a stage got slower than baseline by more than ``tolerance``"""
+    previous = {(r["size"], r["stage"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for current in records:
+        before = previous.get((current["size"], current["stage"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = current["seconds"] / before["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{current['stage']} @ {current['size']}: {before['seconds']:.4f}s -> {current['seconds']:.4f}s ({ratio:.2f}x)"
+            )
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the JurisMind analysis stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Corpus sizes to benchmark (default: 10000 100000)")
+    parser.add_argument("--engines", nargs="+", choices=list(app.SENTIMENT_ENGINES), default=["lexicon"],
+                        help="Sentiment engines to time (default: lexicon)")
+    parser.add_argument("--vocabulary", type=int, default=0,
+                        help="Number of extra synthetic terms mixed into the corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for corpus generation")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory pass")
+    parser.add_argument("--excel", action="store_true",
+                        help="Also time .xlsx ingestion, streaming versus the legacy pandas path")
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a previous JSON results file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown versus baseline before flagging a regression (default: 0.2)")
+    parser.add_argument("--import-budget", type=float, default=0.5,
+                        help="Maximum seconds allowed for a cold 'import app' (default: 0.5)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import_seconds = measure_import_time()
+    records = [{"size": 0, "stage": "import app", "seconds": round(import_seconds, 6),
+                "rows_per_second": None, "peak_mb": None}]
+    with tempfile.TemporaryDirectory() as workdir:
+        warm_up(args.engines, workdir, excel=args.excel)
+        for size in args.sizes:
+            records.extend(benchmark_size(size, args.engines, args.vocabulary, args.seed, workdir,
+                                          memory=not args.no_memory, excel=args.excel))
+
+    for r in records:
+        peak = f"{r['peak_mb']:9.2f} MiB" if r["peak_mb"] is not None else ""
+        print(f"{r['size']:>9}  {r['stage']:<34} {r['seconds']:10.4f}s  {peak}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "available_cpus": app.available_cpus(),
+            "seed": args.seed,
+            "vocabulary": args.vocabulary,
+        },
+        "results": records,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out_file:
+            json.dump(report, out_file, indent=2)
+
+    regressions = []
+    if import_seconds > args.import_budget:
+        regressions.append(f"import app: {import_seconds:.3f}s exceeds the {args.import_budget:.3f}s budget")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions.extend(compare_to_baseline(records, json.load(baseline_file), args.tolerance))
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Merging analyses into an AnalysisStore"""
+
+import io
+
+import pytest
+
+import app
+
+class NamedBytesIO(io.BytesIO):
+    """In-memory upload with the ``name`` and ``size`` Streamlit's UploadedFile carries"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+def text_upload(comments, name="batch.txt"):
+    return NamedBytesIO("\n".join(comments).encode("utf-8"), name)
+
+def analyse(comments, keyword_budget_mb=None):
+    """Run the parse, score and keyword stages (no chart rendering) and pack the store"""
+    pipeline = app.AnalysisPipeline(app.stopwords, engine="lexicon", keyword_budget_mb=keyword_budget_mb)
+    pipeline.parse(text_upload(comments))
+    pipeline.score()
+    pipeline.count_keywords()
+    return pipeline.build_store()
+
+def corpus(size):
+    base = app.create_sample_data()
+    return [f"{base[i % len(base)]} term{i % 400}" for i in range(size)]
+
+def test_exact_append_matches_full_analysis():
+    comments = corpus(600)
+    merged = analyse(comments[:400]).copy().append(analyse(comments[400:]))
+    full = analyse(comments)
+    assert merged.top_keywords(1000) == full.top_keywords(1000)
+    for word in ("product", "term200", "term399"):
+        assert merged.matches(word).tolist() == full.matches(word).tolist()
+
+def test_approximate_store_refuses_append_even_without_sketch_error():
+    comments = corpus(600)
+    approximate = analyse(comments[:400], keyword_budget_mb=4.0)
+    # The sketch never pruned, yet only its top words were indexed
+    assert approximate.keyword_error == 0
+    assert approximate.approximate
+    assert len(approximate.vocabulary) <= app.KEYWORD_TOP_K
+    with pytest.raises(ValueError):
+        approximate.copy().append(analyse(comments[400:]))
+    with pytest.raises(ValueError):
+        analyse(comments[400:]).copy().append(approximate)
+
+@pytest.mark.parametrize("name, data", [("header_only.csv", b"comment\n"), ("blank.txt", b"\n  \n")])
+def test_empty_upload_renders_no_charts(name, data):
+    store = app.AnalysisPipeline(app.stopwords, engine="lexicon").run(NamedBytesIO(data, name))
+    assert len(store) == 0
+    assert store.sentiment_pie_png is None
+    assert store.wordcloud_png is None
+
+def test_memory_budget_stops_at_the_first_chunk_over_budget():
+    comments = corpus(3 * app.CSV_CHUNK_ROWS)
+    pipeline = app.AnalysisPipeline(app.stopwords, engine="lexicon", memory_budget=app.MIB)
+    with pytest.raises(MemoryError):
+        pipeline.run(text_upload(comments))
+    # Parsing stopped after the first chunk and nothing was scored
+    assert 0 < pipeline.partial["parsed"] < 2 * app.CSV_CHUNK_ROWS
+    assert "polarity" not in pipeline.results
+
+def test_memory_budget_counts_the_store_being_appended_to():
+    comments = corpus(600)
+    held = analyse(comments[:400])
+    pipeline = app.AnalysisPipeline(app.stopwords, engine="lexicon", memory_budget=held.nbytes, memory_held=held.nbytes)
+    with pytest.raises(MemoryError):
+        pipeline.run(text_upload(comments[400:]))
@@ -0,0 +1,44 @@
+"""Near-duplicate clusters and the "+N similar" counts shown next to representatives"""
+
+import numpy as np
+
+import app
+
+FILLER = (
+    "the delivery arrived on time and the packaging was intact while the support team answered every question "
+    "we had about setup and billing within a day so overall we would order from this shop again next year"
+)
+
+def similar_counts(comment_ids, clusters):
+    sizes = np.bincount(clusters, minlength=len(clusters))
+    return [app.similar_count(comment_id, clusters, sizes) for comment_id in comment_ids.tolist()]
+
+def make_comments():
+    # 0 and 1 differ by one word and 2 repeats 1, so all three form one cluster labelled by comment 0
+    return [
+        f"excellent product {FILLER}",
+        f"superb product {FILLER}",
+        f"superb product {FILLER}",
+        "completely unrelated short note about parking",
+    ]
+
+def test_cluster_labels_point_at_first_member():
+    clusters = app.near_duplicate_clusters(make_comments())
+    assert clusters.tolist() == [0, 0, 0, 3]
+
+def test_similar_counts_in_comment_view():
+    comments = make_comments()
+    clusters = app.near_duplicate_clusters(comments)
+    shown = app.cluster_representatives(np.arange(len(comments)), clusters)
+    assert shown.tolist() == [0, 3]
+    assert similar_counts(shown, clusters) == [2, 0]
+
+def test_similar_counts_in_keyword_view_use_the_cluster_label():
+    comments = make_comments()
+    clusters = app.near_duplicate_clusters(comments)
+    doc_terms = app.DocumentTermMatrix.from_comments(comments, app.stopwords)
+    matching = doc_terms.column_nonzeros(doc_terms.word_ids["superb"])
+    shown = app.cluster_representatives(matching, clusters)
+    # The representative is the first matching member, not the comment that labels the cluster
+    assert shown.tolist() == [1]
+    assert similar_counts(shown, clusters) == [2]
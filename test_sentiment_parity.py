@@ -0,0 +1,58 @@
+"""Parity of the fast lexicon engine against per-comment TextBlob"""
+
+import csv
+import os
+
+import pytest
+
+import app
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_comments.csv")
+
+def load_sample_csv():
+    with open(SAMPLE_CSV, newline="", encoding="utf-8") as sample_file:
+        return [row["comment"] for row in csv.DictReader(sample_file) if row.get("comment")]
+
+def assert_parity(comments):
+    report = app.compare_sentiment_engines(comments)
+    assert report["comments"] == len(comments)
+    assert report["max_abs_diff"] == 0
+    assert report["label_agreement"] == 1.0
+
+def test_sample_data_parity():
+    assert_parity(app.create_sample_data())
+
+def test_sample_csv_parity():
+    comments = load_sample_csv()
+    assert comments
+    assert_parity(comments)
+
+@pytest.mark.parametrize("comment", [
+    # negation
+    "This is not good.",
+    "I don't like it, not bad though",
+    "never happy with the support",
+    # modifiers, including a negated modifier
+    "very good service",
+    "extremely bad and really slow",
+    "not very helpful",
+    # emoticons
+    "Great product :)",
+    "Broke after a week :(",
+    "meh :-/ ok I guess ;)",
+    # exclamations and sarcasm
+    "Wonderful!",
+    "Amazing!!! best ever!",
+    "Oh great, it broke again (!)",
+    # nothing to score
+    "",
+    "12345",
+])
+def test_edge_case_parity(comment):
+    assert_parity([comment])
+
+def test_batch_parity_matches_single_comments():
+    comments = ["not good", "very very good!", "bad :(", "(!)", "okay"]
+    batch = app.get_lexicon_engine().polarities(comments)
+    for comment, polarity in zip(comments, batch.tolist()):
+        assert polarity == app.get_lexicon_engine().polarities([comment])[0]